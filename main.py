@@ -1,13 +1,75 @@
 import os
-import hashlib
-import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext, ttk
-from PIL import Image, ImageTk, ImageFile
-import imagehash
+import argparse
+import array
+import collections
+import csv
+import heapq
+import importlib
+import itertools
+import json
+import math
+import socket
+import stat
+import struct
+import tempfile
+import threading
+import time
 from datetime import datetime
 
-# Permite carregar imagens truncadas/corrompidas parcialmente
-ImageFile.LOAD_TRUNCATED_IMAGES = True
+# Momento em que o módulo começou a carregar (usado na medição de inicialização)
+MODULE_LOAD_START = time.perf_counter()
+
+class LazyModule:
+    """
+    Adia o import de um módulo até o primeiro acesso a um de seus atributos.
+    Assim quem só precisa de UnionFind ou get_file_md5 não paga por tkinter/PIL/NumPy/SciPy,
+    e a interface aparece antes de as bibliotecas pesadas terminarem de carregar.
+    """
+    def __init__(self, name, on_load=None):
+        self._name = name
+        self._on_load = on_load
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            module = importlib.import_module(self._name)
+            if self._on_load:
+                self._on_load(module)
+            self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+def configure_pil(module):
+    """Configuração global do PIL, aplicada assim que ele é carregado."""
+    from PIL import ImageFile
+    # Permite carregar imagens truncadas/corrompidas parcialmente
+    ImageFile.LOAD_TRUNCATED_IMAGES = True
+
+tk = LazyModule("tkinter")
+filedialog = LazyModule("tkinter.filedialog")
+messagebox = LazyModule("tkinter.messagebox")
+scrolledtext = LazyModule("tkinter.scrolledtext")
+ttk = LazyModule("tkinter.ttk")
+Image = LazyModule("PIL.Image", on_load=configure_pil)
+ImageTk = LazyModule("PIL.ImageTk")
+ImageSequence = LazyModule("PIL.ImageSequence")
+features = LazyModule("PIL.features")
+imagehash = LazyModule("imagehash")
+np = LazyModule("numpy")
+hashlib = LazyModule("hashlib")
+asyncio = LazyModule("asyncio")
+multiprocessing = LazyModule("multiprocessing")
+
+# Módulos carregados em segundo plano enquanto a janela inicial é exibida
+HEAVY_MODULES = [Image, ImageTk, ImageSequence, features, imagehash, np, hashlib]
+
+def preload_heavy_modules():
+    """Carrega as bibliotecas pesadas (usado em uma thread enquanto o usuário escolhe a pasta)."""
+    for module in HEAVY_MODULES:
+        module._load()
+    import scipy.fftpack  # noqa: F401 (usado pelo pHash)
 
 class UnionFind:
     """Classe simples de Union-Find (Disjoint Set)."""
@@ -15,6 +77,12 @@ class UnionFind:
         self.parent = list(range(n))
         self.rank = [0]*n
 
+    def add(self):
+        """Adiciona um novo elemento (conjunto unitário) e retorna seu índice."""
+        self.parent.append(len(self.parent))
+        self.rank.append(0)
+        return len(self.parent) - 1
+
     def find(self, x):
         if self.parent[x] != x:
             self.parent[x] = self.find(self.parent[x])
@@ -32,6 +100,740 @@ class UnionFind:
                 self.parent[rootY] = rootX
                 self.rank[rootX] += 1
 
+class ArrayUnionFind:
+    """
+    Union-Find com pai/rank em arrays NumPy compactos.
+    Se work_dir for informado, os arrays ficam mapeados em disco (np.memmap).
+    """
+    def __init__(self, n, work_dir=None):
+        size = max(n, 1)
+        if work_dir:
+            self.parent = np.memmap(os.path.join(work_dir, "uf_parent.bin"), dtype=np.int64, mode="w+", shape=(size,))
+            self.rank = np.memmap(os.path.join(work_dir, "uf_rank.bin"), dtype=np.uint8, mode="w+", shape=(size,))
+        else:
+            self.parent = np.empty(size, dtype=np.int64)
+            self.rank = np.zeros(size, dtype=np.uint8)
+        self.parent[:] = np.arange(size, dtype=np.int64)
+
+    def find(self, x):
+        # Path halving (iterativo, sem recursão)
+        parent = self.parent
+        while True:
+            p = int(parent[x])
+            if p == x:
+                return x
+            gp = int(parent[p])
+            parent[x] = gp
+            x = gp
+
+    def union(self, x, y):
+        rootX = self.find(x)
+        rootY = self.find(y)
+        if rootX != rootY:
+            if self.rank[rootX] < self.rank[rootY]:
+                self.parent[rootX] = rootY
+            elif self.rank[rootX] > self.rank[rootY]:
+                self.parent[rootY] = rootX
+            else:
+                self.parent[rootY] = rootX
+                self.rank[rootX] += 1
+
+class ExternalSorter:
+    """
+    Ordena tuplas de inteiros de 64 bits sem mantê-las todas na memória:
+    grava runs ordenadas em disco quando o buffer enche e depois faz um merge em streaming.
+    Com mais de max_open_runs runs, o merge é feito em vários níveis (limite de arquivos abertos).
+    """
+    def __init__(self, fields, max_records, work_dir, max_open_runs=64):
+        self.record = struct.Struct("<" + "Q" * fields)
+        self.max_records = max(1, max_records)
+        self.work_dir = work_dir
+        self.max_open_runs = max(2, max_open_runs)
+        self.buffer = []
+        self.run_paths = []
+
+    def add(self, rec):
+        self.buffer.append(rec)
+        if len(self.buffer) >= self.max_records:
+            self._spill()
+
+    def _write_run(self, records):
+        """Grava registros já ordenados em um novo arquivo de run e retorna o caminho."""
+        fd, path = tempfile.mkstemp(suffix=".run", dir=self.work_dir)
+        with os.fdopen(fd, "wb") as f:
+            pack = self.record.pack
+            for rec in records:
+                f.write(pack(*rec))
+        return path
+
+    def _spill(self):
+        if not self.buffer:
+            return
+        self.buffer.sort()
+        self.run_paths.append(self._write_run(self.buffer))
+        self.buffer = []
+
+    def _read_run(self, path):
+        chunk_size = self.record.size * 4096
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                yield from self.record.iter_unpack(chunk)
+
+    def merged(self):
+        """Retorna os registros em ordem crescente, consumindo o sorter."""
+        if not self.run_paths:
+            # Tudo coube no buffer: ordena em memória
+            self.buffer.sort()
+            records, self.buffer = self.buffer, []
+            yield from records
+            return
+
+        self._spill()
+        try:
+            # Junta as runs em lotes até sobrarem no máximo max_open_runs
+            while len(self.run_paths) > self.max_open_runs:
+                batch = self.run_paths[:self.max_open_runs]
+                merged_path = self._write_run(heapq.merge(*(self._read_run(path) for path in batch)))
+                self.run_paths = self.run_paths[self.max_open_runs:] + [merged_path]
+                for path in batch:
+                    os.remove(path)
+            yield from heapq.merge(*(self._read_run(path) for path in self.run_paths))
+        finally:
+            for path in self.run_paths:
+                os.remove(path)
+            self.run_paths = []
+
+def phash_to_int(hash_val):
+    """Converte um ImageHash em inteiro (bits na mesma ordem de str(hash_val))."""
+    return int(str(hash_val), 16)
+
+def hash_bands(hash_bits, num_bands):
+    """
+    Divide os bits do hash em num_bands faixas contíguas, retornando (shift, máscara) de cada uma.
+    Pelo princípio da casa dos pombos, dois hashes com distância <= threshold
+    coincidem em pelo menos uma de threshold + 1 faixas.
+    """
+    num_bands = max(1, min(num_bands, hash_bits))
+    bands = []
+    shift = 0
+    for band_id in range(num_bands):
+        width = hash_bits // num_bands + (1 if band_id < hash_bits % num_bands else 0)
+        bands.append((shift, (1 << width) - 1))
+        shift += width
+    return bands
+
+# Custo de comparar um candidato em relação ao de sondar um bucket (medido com NumPy)
+CANDIDATE_COST = 2
+
+def choose_num_bands(hash_bits, threshold, count, max_band_bits=22):
+    """
+    Número de faixas do multi-index hashing para count hashes: minimiza o custo estimado de uma
+    busca, faixas × vizinhos sondados por faixa × (1 + CANDIDATE_COST × hashes esperados por bucket).
+    Quanto maior o acervo, mais largas as faixas escolhidas, mantendo os buckets pequenos;
+    max_band_bits limita a largura (e o tamanho da tabela de início dos buckets), que também não
+    passa de cerca de 4x o número de hashes. Com threshold pequeno, as faixas mais estreitas
+    permitidas podem ser menos de threshold + 1: o raio de sondagem (threshold // faixas) cresce no lugar.
+    """
+    max_band_bits = min(max_band_bits, max(8, count.bit_length() + 2))
+    min_bands = -(-hash_bits // max_band_bits)
+    best = None
+    for num_bands in range(min_bands, max(min_bands, threshold + 1) + 1):
+        widths = [mask.bit_length() for _, mask in hash_bands(hash_bits, num_bands)]
+        probes = sum(math.comb(max(widths), k) for k in range(threshold // len(widths) + 1))
+        cost = len(widths) * probes * (1 + CANDIDATE_COST * count / 2 ** min(widths))
+        if best is None or cost < best[0]:
+            best = (cost, len(widths))
+    return best[1]
+
+def band_probe_masks(mask, radius):
+    """Retorna todas as máscaras de até radius bits dentro de uma faixa (para sondar buckets vizinhos)."""
+    width = mask.bit_length()
+    probes = []
+    for weight in range(min(radius, width) + 1):
+        for positions in itertools.combinations(range(width), weight):
+            probe = 0
+            for pos in positions:
+                probe |= 1 << pos
+            probes.append(probe)
+    return probes
+
+def popcount64(values):
+    """Número de bits 1 de cada elemento de um array uint64."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    return np.unpackbits(values.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+def expand_ranges(starts, ends):
+    """
+    Concatena os intervalos [starts[i], ends[i]) em um único array de posições, sem laço Python.
+    Retorna (i de cada posição, posições).
+    """
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    owners = np.repeat(np.arange(len(starts)), lengths)
+    offsets = np.cumsum(lengths) - lengths
+    return owners, np.arange(total) - np.repeat(offsets - starts, lengths)
+
+def range_blocks(starts, ends, max_items):
+    """
+    Percorre os intervalos [starts[i], ends[i]) em blocos de no máximo 2 * max_items posições
+    (intervalos maiores são quebrados), para limitar a memória de cada comparação.
+    Gera (i de cada posição, posições) por bloco.
+    """
+    max_items = max(1, max_items)
+    nonempty = np.flatnonzero(ends > starts)
+    starts, ends = starts[nonempty], ends[nonempty]
+    lengths = ends - starts
+    if int(lengths.sum()) <= max_items:
+        owners, positions = expand_ranges(starts, ends)
+        if len(positions):
+            yield nonempty[owners], positions
+        return
+    pieces = (lengths + max_items - 1) // max_items
+    owners = np.repeat(np.arange(len(starts)), pieces)
+    piece_no = np.arange(len(owners)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    piece_starts = starts[owners] + piece_no * max_items
+    piece_ends = np.minimum(piece_starts + max_items, ends[owners])
+    piece_lengths = piece_ends - piece_starts
+    block_ids = (np.cumsum(piece_lengths) - piece_lengths) // max_items
+    for block in np.split(np.arange(len(owners)), np.flatnonzero(np.diff(block_ids)) + 1):
+        if len(block):
+            local_owners, positions = expand_ranges(piece_starts[block], piece_ends[block])
+            yield nonempty[owners[block][local_owners]], positions
+
+def sort_band(hashes, shift, mask):
+    """Ordena as entradas pelo valor de uma faixa; retorna (valores ordenados, ordem, início de cada bucket)."""
+    values = (hashes >> np.uint64(shift)) & np.uint64(mask)
+    order = np.argsort(values, kind="stable")
+    values = values[order]
+    # Início de cada bucket: o bucket v vai de starts[v] a starts[v + 1]
+    return values, order, np.searchsorted(values, np.arange(mask + 2, dtype=np.uint64))
+
+def closest_per_owner(owners, distances):
+    """Menor distância de cada dono (ex.: as 8 orientações de uma imagem), da mais próxima para a mais distante."""
+    order = np.lexsort((distances, owners))
+    owners, distances = owners[order], distances[order]
+    first = np.ones(len(owners), dtype=bool)
+    first[1:] = owners[1:] != owners[:-1]
+    owners, distances = owners[first], distances[first]
+    order = np.argsort(distances, kind="stable")
+    return owners[order], distances[order]
+
+# Entradas novas comparadas por força bruta antes de entrarem em um segmento ordenado
+HAMMING_TAIL_SIZE = 1024
+
+class HammingIndex:
+    """
+    Índice em memória para busca de hashes com distância de Hamming <= threshold (multi-index hashing).
+    As entradas ficam em arrays NumPy divididos em segmentos; cada segmento é ordenado por faixa
+    (como a ReferenceLibrary), com o número de faixas escolhido pelo seu tamanho (choose_num_bands),
+    e dois hashes dentro do threshold diferem em no máximo threshold // faixas bits em alguma faixa.
+    As entradas recentes ficam em uma cauda comparada por força bruta; quando a cauda enche vira um
+    segmento, e segmentos de tamanho parecido são reconstruídos juntos (poucos segmentos, cada
+    entrada reordenada O(log n) vezes). Cada chave pode ser indexada por vários hashes
+    (ex.: as 8 orientações de uma imagem).
+    """
+    def __init__(self, threshold, hash_bits=64, num_bands=None, max_band_bits=22):
+        self.threshold = threshold
+        self.hash_bits = hash_bits
+        self.num_bands = num_bands  # None: escolhido pelo tamanho de cada segmento
+        self.max_band_bits = max_band_bits
+        self.keys = []
+        self.key_ids = {}
+        self.entry_hashes = np.empty(HAMMING_TAIL_SIZE, dtype=np.uint64)
+        self.entry_owners = np.empty(HAMMING_TAIL_SIZE, dtype=np.int64)
+        self.size = 0
+        self.segments = []
+        self.probe_cache = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key, hashes):
+        """Indexa key por um hash (int) ou por uma lista de hashes."""
+        if isinstance(hashes, int):
+            hashes = [hashes]
+        if key not in self.key_ids:
+            self.key_ids[key] = len(self.keys)
+            self.keys.append(key)
+        end = self.size + len(hashes)
+        if end > len(self.entry_hashes):
+            capacity = max(end, 2 * len(self.entry_hashes))
+            self.entry_hashes = np.resize(self.entry_hashes, capacity)
+            self.entry_owners = np.resize(self.entry_owners, capacity)
+        self.entry_hashes[self.size:end] = np.array(hashes, dtype=np.uint64)
+        self.entry_owners[self.size:end] = self.key_ids[key]
+        self.size = end
+
+    def _probes(self, mask, radius):
+        key = (mask, radius)
+        if key not in self.probe_cache:
+            self.probe_cache[key] = np.array(band_probe_masks(mask, radius), dtype=np.uint64)
+        return self.probe_cache[key]
+
+    def _build_segment(self, start, end):
+        """
+        Ordena as entradas [start, end) por faixa. As ordens e as tabelas de início dos buckets de
+        todas as faixas ficam concatenadas, para uma consulta sondar o segmento inteiro de uma vez.
+        """
+        num_bands = self.num_bands or choose_num_bands(self.hash_bits, self.threshold, end - start,
+                                                       self.max_band_bits)
+        bands = hash_bands(self.hash_bits, num_bands)
+        radius = self.threshold // len(bands)
+        hashes = self.entry_hashes[start:end]
+        orders, starts, table_offsets = [], [], []
+        for band_id, (shift, mask) in enumerate(bands):
+            _, order, band_starts = sort_band(hashes, shift, mask)
+            orders.append(order + start)
+            table_offsets.append(sum(len(table) for table in starts))
+            starts.append(band_starts + band_id * (end - start))
+        # Faixas com menos vizinhos completam a matriz com a máscara 0 (o próprio bucket, repetido)
+        probes = [self._probes(mask, radius) for _, mask in bands]
+        probe_matrix = np.zeros((len(bands), max(len(p) for p in probes)), dtype=np.uint64)
+        for band_id, band_probes in enumerate(probes):
+            probe_matrix[band_id, :len(band_probes)] = band_probes
+        return {'start': start, 'end': end,
+                'shifts': np.array([shift for shift, _ in bands], dtype=np.uint64),
+                'masks': np.array([mask for _, mask in bands], dtype=np.uint64),
+                'probes': probe_matrix,
+                'table_offsets': np.array(table_offsets, dtype=np.uint64),
+                'order': np.concatenate(orders), 'starts': np.concatenate(starts)}
+
+    def _segment_candidates(self, segment, query_hashes):
+        """Posições das entradas do segmento nos buckets sondados (com repetições entre faixas)."""
+        values = (query_hashes[:, None] >> segment['shifts'][None, :]) & segment['masks'][None, :]
+        keys = ((values[:, :, None] ^ segment['probes'][None, :, :])
+                + segment['table_offsets'][None, :, None]).ravel()
+        starts = segment['starts']
+        _, positions = expand_ranges(starts[keys], starts[keys + np.uint64(1)])
+        return segment['order'][positions]
+
+    def _flush_tail(self):
+        """Transforma a cauda em segmento, juntando os segmentos finais de tamanho parecido."""
+        start = self.segments[-1]['end'] if self.segments else 0
+        self.segments.append(self._build_segment(start, self.size))
+        while len(self.segments) > 1:
+            last, previous = self.segments[-1], self.segments[-2]
+            if previous['end'] - previous['start'] > 2 * (last['end'] - last['start']):
+                break
+            self.segments[-2:] = [self._build_segment(previous['start'], last['end'])]
+
+    def query(self, hashes):
+        """
+        Busca as chaves a até threshold bits de um hash (int) ou de qualquer hash de uma lista.
+        Retorna lista de (key, distância), da mais próxima para a mais distante.
+        """
+        if isinstance(hashes, int):
+            hashes = [hashes]
+        tail_start = self.segments[-1]['end'] if self.segments else 0
+        if self.size - tail_start >= HAMMING_TAIL_SIZE:
+            self._flush_tail()
+            tail_start = self.size
+
+        query_hashes = np.array(hashes, dtype=np.uint64)
+        candidates = [self._segment_candidates(segment, query_hashes) for segment in self.segments]
+        candidates.append(np.arange(tail_start, self.size))
+        entries = np.concatenate(candidates)
+
+        distances = popcount64(self.entry_hashes[entries][:, None] ^ query_hashes[None, :]).min(axis=1)
+        close = distances <= self.threshold
+        owners, distances = closest_per_owner(self.entry_owners[entries[close]], distances[close])
+        return [(self.keys[owner], int(distance)) for owner, distance in zip(owners, distances)]
+
+# Orientação EXIF (tag 0x0112) -> transposição (Image.Transpose) que deixa a imagem "em pé"
+EXIF_ORIENTATION_TRANSPOSE = {
+    2: "FLIP_LEFT_RIGHT",
+    3: "ROTATE_180",
+    4: "FLIP_TOP_BOTTOM",
+    5: "TRANSPOSE",
+    6: "ROTATE_270",
+    7: "TRANSVERSE",
+    8: "ROTATE_90",
+}
+
+def phash_dct_lowfreq(image, gray=None, hash_size=8, highfreq_factor=4):
+    """
+    Mesmos passos do imagehash.phash até a DCT, retornando o bloco de baixa frequência.
+    gray é a imagem já convertida para tons de cinza, se quem chama já a tiver.
+    O proxy 32x32 é corrigido pela orientação EXIF (barato, pois já está reduzido).
+    """
+    import scipy.fftpack
+    img_size = hash_size * highfreq_factor
+    orientation = image.getexif().get(0x0112, 1)
+    if gray is None:
+        gray = image.convert("L")
+    proxy = gray.resize((img_size, img_size), Image.LANCZOS)
+    if orientation in EXIF_ORIENTATION_TRANSPOSE:
+        proxy = proxy.transpose(getattr(Image.Transpose, EXIF_ORIENTATION_TRANSPOSE[orientation]))
+    pixels = np.asarray(proxy)
+    dct = scipy.fftpack.dct(scipy.fftpack.dct(pixels, axis=0), axis=1)
+    return dct[:hash_size, :hash_size]
+
+def dihedral_phashes(dct_lowfreq):
+    """
+    Calcula o pHash (como int) das 8 transformações diedrais (rotações de 90° e espelhamentos)
+    a partir de uma única DCT: espelhar a imagem inverte o sinal dos coeficientes ímpares
+    e transpor a imagem transpõe a DCT. O índice 0 é a orientação original.
+    """
+    hash_size = dct_lowfreq.shape[0]
+    sign = (-1.0) ** np.arange(hash_size)
+    hashes = []
+    for base in (dct_lowfreq, dct_lowfreq.T):
+        for row_sign in (None, sign[:, None]):
+            for col_sign in (None, sign[None, :]):
+                coeffs = base
+                if row_sign is not None:
+                    coeffs = coeffs * row_sign
+                if col_sign is not None:
+                    coeffs = coeffs * col_sign
+                bits = coeffs > np.median(coeffs)
+                hashes.append(int.from_bytes(np.packbits(bits).tobytes(), "big"))
+    return hashes
+
+# Amostragem de quadros-chave em imagens com vários quadros (GIF/APNG/WebP animados)
+KEYFRAME_STRIDE = 4
+MAX_KEYFRAMES = 32
+# Razão mínima entre o número de quadros-chave de duas animações para compará-las
+MIN_SIGNATURE_RATIO = 0.5
+
+def frame_signature(image, stride=KEYFRAME_STRIDE, max_frames=MAX_KEYFRAMES):
+    """
+    Retorna o pHash (int) de um quadro a cada stride quadros, até max_frames quadros-chave.
+    Em animações longas o passo aumenta para os quadros-chave cobrirem a animação inteira,
+    assim duas versões com números de quadros diferentes são alinhadas pela mesma duração.
+    Os quadros são decodificados um por vez pelo ImageSequence, sem manter cópias na memória.
+    """
+    stride = max(stride, math.ceil(getattr(image, "n_frames", 1) / max_frames))
+    signature = []
+    for frame_idx, frame in enumerate(ImageSequence.Iterator(image)):
+        if frame_idx % stride:
+            continue
+        signature.append(phash_to_int(imagehash.phash(frame)))
+        if len(signature) >= max_frames:
+            break
+    image.seek(0)
+    return signature
+
+def signature_distance(sig_a, sig_b):
+    """
+    Distância média entre os quadros-chave de duas animações, alinhados pela posição relativa.
+    Retorna None se as animações tiverem durações muito diferentes para serem comparadas.
+    """
+    if len(sig_a) > len(sig_b):
+        sig_a, sig_b = sig_b, sig_a
+    if len(sig_a) < len(sig_b) * MIN_SIGNATURE_RATIO:
+        return None
+    total = 0
+    for i, hash_a in enumerate(sig_a):
+        j = round(i * (len(sig_b) - 1) / max(len(sig_a) - 1, 1))
+        total += (hash_a ^ sig_b[j]).bit_count()
+    return total / len(sig_a)
+
+def find_similar_groups(images_data, threshold=10, dihedral_hashes=None, frame_signatures=None):
+    """
+    Cria um grafo de similaridade usando o Union-Find e retorna os grupos com mais de uma imagem.
+    images_data é uma lista de (caminho, pHash, md5). Imagens estáticas se ligam se diff <= threshold
+    (pelas 8 orientações, se houver dihedral_hashes). Animações (frame_signatures) só se ligam entre
+    si, pela distância média dos quadros-chave alinhados: um primeiro quadro igual (ex.: uma abertura
+    preta) não mostra que duas animações são a mesma.
+    """
+    dihedral_hashes = dihedral_hashes or {}
+    frame_signatures = frame_signatures or {}
+    n = len(images_data)
+    uf = UnionFind(n)
+    stills = [i for i, (filepath, _, _) in enumerate(images_data) if filepath not in frame_signatures]
+
+    if dihedral_hashes:
+        # Indexa as 8 orientações de cada imagem e busca só a original (quase linear)
+        index = HammingIndex(threshold)
+        for i in stills:
+            index.add(i, dihedral_hashes[images_data[i][0]])
+        for i in stills:
+            for j, _ in index.query(dihedral_hashes[images_data[i][0]][0]):
+                uf.union(i, j)
+    else:
+        # Compara todos os pares de imagens (O(n^2))
+        for a, i in enumerate(stills):
+            for j in stills[a + 1:]:
+                diff = abs(images_data[i][1] - images_data[j][1])
+                if diff <= threshold:
+                    uf.union(i, j)
+
+    if frame_signatures:
+        # Animações: candidatas pelo índice de Hamming (qualquer quadro-chave próximo),
+        # confirmadas pela distância média dos quadros-chave alinhados
+        animations = [i for i, (filepath, _, _) in enumerate(images_data) if filepath in frame_signatures]
+        index = HammingIndex(threshold)
+        for i in animations:
+            index.add(i, frame_signatures[images_data[i][0]])
+        for i in animations:
+            signature = frame_signatures[images_data[i][0]]
+            for j, _ in index.query(signature):
+                if j <= i:
+                    continue
+                distance = signature_distance(signature, frame_signatures[images_data[j][0]])
+                if distance is not None and distance <= threshold:
+                    uf.union(i, j)
+
+    # Agrupa de acordo com o root
+    root_to_group = {}
+    for i in range(n):
+        root_i = uf.find(i)
+        if root_i not in root_to_group:
+            root_to_group[root_i] = []
+        root_to_group[root_i].append(images_data[i])
+
+    # Filtra grupos que tenham mais de 1 imagem
+    return [group for group in root_to_group.values() if len(group) > 1]
+
+# Estimativa de bytes por registro mantido no buffer (tupla Python + ints)
+BYTES_PER_BUFFERED_RECORD = 128
+# Estimativa de bytes por candidato em um bloco de comparação (posições, hashes, ids e temporários NumPy)
+BYTES_PER_CANDIDATE = 64
+
+class StreamingGrouper:
+    """
+    Agrupamento out-of-core para acervos que não cabem na RAM.
+    1. Uma ordenação externa por hash une direto as imagens com hashes idênticos (inclusive
+       entre orientações) e deixa um registro por hash distinto.
+    2. Os hashes distintos são ordenados por faixa larga (band) em arrays mapeados em disco; cada
+       hash original sonda os vizinhos de até threshold // faixas bits em cada faixa (como o
+       HammingIndex) e as distâncias são calculadas com NumPy em blocos limitados. O número de
+       faixas acompanha o tamanho do acervo (choose_num_bands), para os buckets ficarem pequenos.
+    3. O Union-Find fica em um array (mapeado em disco se necessário) e os grupos saem em streaming.
+    O pico de memória é limitado por memory_budget_mb. Só um aglomerado muito denso de hashes
+    distintos a poucos bits uns dos outros custa tempo quadrático no tamanho do aglomerado.
+    """
+    def __init__(self, threshold=10, memory_budget_mb=256, hash_bits=64, num_bands=None, work_dir=None):
+        self.threshold = threshold
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.hash_bits = hash_bits
+        self.num_bands = num_bands  # None: escolhido pelo número de hashes distintos
+        self.bands = []
+        self.probes = []
+        # A tabela de início dos buckets de uma faixa (8 bytes por valor) usa até 1/8 do orçamento
+        self.max_band_bits = max(8, (self.memory_budget // 64).bit_length() - 1)
+        self.tmp_dir = tempfile.TemporaryDirectory(prefix="imagecleaner_", dir=work_dir)
+        self.work_dir = self.tmp_dir.name
+
+        # Metade do orçamento para o buffer de ordenação, um quarto para os blocos de candidatos
+        self.max_buffered = self.memory_budget // 2 // BYTES_PER_BUFFERED_RECORD
+        self.max_candidates = max(1024, self.memory_budget // 4 // BYTES_PER_CANDIDATE)
+        self.hash_sorter = ExternalSorter(3, self.max_buffered, self.work_dir)
+
+        # Metadados (caminho, hash, md5) ficam em disco, acessados por offset
+        self.meta_header = struct.Struct("<QI")
+        self.offset_record = struct.Struct("<Q")
+        self.meta_file = open(os.path.join(self.work_dir, "meta.bin"), "w+b")
+        self.offsets_file = open(os.path.join(self.work_dir, "offsets.bin"), "w+b")
+        self.count = 0
+
+    def add(self, filepath, hash_int, md5_val, variants=None, extra=None):
+        """
+        Registra uma imagem já processada. extra (dict serializável em JSON, ex.: qualidade)
+        fica em disco junto com o caminho e volta com o grupo.
+        Se variants (hashes das 8 orientações) for informado, todas são indexadas e só o hash
+        original é buscado, como no agrupamento em memória.
+        """
+        idx = self.count
+        payload = f"{filepath}\0{md5_val}\0{json.dumps(extra)}".encode("utf-8", "surrogateescape")
+        self.offsets_file.write(self.offset_record.pack(self.meta_file.tell()))
+        self.meta_file.write(self.meta_header.pack(hash_int, len(payload)))
+        self.meta_file.write(payload)
+
+        # (hash, imagem, 1 se for o hash original)
+        self.hash_sorter.add((hash_int, idx, 1))
+        for variant in (variants or []):
+            self.hash_sorter.add((variant, idx, 0))
+        self.count += 1
+
+    def _write_columns(self, name, rows, dtypes):
+        """Grava as tuplas de rows em um arquivo binário por coluna, em lotes; retorna quantas foram gravadas."""
+        files = [open(os.path.join(self.work_dir, f"{name}_{col}.bin"), "wb") for col in range(len(dtypes))]
+        count = 0
+        try:
+            rows = iter(rows)
+            while True:
+                chunk = list(itertools.islice(rows, self.max_buffered))
+                if not chunk:
+                    break
+                for f, column, dtype in zip(files, zip(*chunk), dtypes):
+                    f.write(np.array(column, dtype=dtype).tobytes())
+                count += len(chunk)
+        finally:
+            for f in files:
+                f.close()
+        return count
+
+    def _open_columns(self, name, dtypes, count):
+        """Abre (np.memmap, somente leitura) as colunas gravadas por _write_columns."""
+        return [np.memmap(os.path.join(self.work_dir, f"{name}_{col}.bin"), dtype=dtype, mode="r", shape=(count,))
+                for col, dtype in enumerate(dtypes)]
+
+    def _distinct_hashes(self, uf):
+        """Une as imagens com hashes idênticos; gera (hash, imagem representante, é original) por hash distinto."""
+        current = None
+        for hash_int, idx, original in self.hash_sorter.merged():
+            if current is not None and hash_int == current[0]:
+                uf.union(current[1], idx)
+                current[2] |= original
+                continue
+            if current is not None:
+                yield tuple(current)
+            current = [hash_int, idx, original]
+        if current is not None:
+            yield tuple(current)
+
+    def _band_rows(self, band_id, hashes, reps):
+        """Gera (valor da faixa, imagem, hash) dos hashes distintos, ordenados pela faixa."""
+        shift, mask = self.bands[band_id]
+        sorter = ExternalSorter(3, self.max_buffered, self.work_dir)
+        for start in range(0, len(hashes), self.max_buffered):
+            chunk = np.asarray(hashes[start:start + self.max_buffered])
+            values = (chunk >> np.uint64(shift)) & np.uint64(mask)
+            for row in zip(values.tolist(), reps[start:start + self.max_buffered].tolist(), chunk.tolist()):
+                sorter.add(row)
+        return sorter.merged()
+
+    def _union_band(self, uf, band_id, hashes, reps, originals):
+        """Une os pares a até threshold bits encontrados pelas sondagens de uma faixa."""
+        band_name = f"band{band_id}"
+        dtypes = (np.uint64, np.int64, np.uint64)
+        count = self._write_columns(band_name, self._band_rows(band_id, hashes, reps), dtypes)
+        keys, band_reps, band_hashes = self._open_columns(band_name, dtypes, count)
+
+        shift, mask = self.bands[band_id]
+        probes = self.probes[band_id]
+        # Início de cada bucket no array ordenado (o bucket v vai de starts[v] a starts[v + 1])
+        starts = np.searchsorted(keys, np.arange(mask + 2, dtype=np.uint64))
+        chunk_size = max(1, self.max_candidates // len(probes))
+        for start in range(0, len(hashes), chunk_size):
+            selected = np.flatnonzero(originals[start:start + chunk_size]) + start
+            if not len(selected):
+                continue
+            query_hashes = np.asarray(hashes[selected])
+            query_reps = np.asarray(reps[selected])
+            probe_keys = (((query_hashes >> np.uint64(shift)) & np.uint64(mask))[:, None] ^ probes[None, :]).ravel()
+            lefts = starts[probe_keys]
+            rights = starts[probe_keys + np.uint64(1)]
+
+            for owners, positions in range_blocks(lefts, rights, self.max_candidates):
+                query = owners // len(probes)
+                distances = popcount64(query_hashes[query] ^ band_hashes[positions])
+                close = np.flatnonzero(distances <= self.threshold)
+                if len(close):
+                    pairs = np.stack([query_reps[query[close]], band_reps[positions[close]]], axis=1)
+                    pairs = np.unique(pairs[pairs[:, 0] != pairs[:, 1]], axis=0)
+                    for a, b in pairs.tolist():
+                        uf.union(a, b)
+        del keys, band_reps, band_hashes
+
+    def _load(self, idx):
+        """Lê (caminho, hash, md5, extra) de uma imagem a partir dos arquivos em disco."""
+        self.offsets_file.seek(idx * self.offset_record.size)
+        (offset,) = self.offset_record.unpack(self.offsets_file.read(self.offset_record.size))
+        self.meta_file.seek(offset)
+        hash_int, length = self.meta_header.unpack(self.meta_file.read(self.meta_header.size))
+        filepath, md5_val, extra = self.meta_file.read(length).decode("utf-8", "surrogateescape").split("\0")
+        return (filepath, hash_int, md5_val, json.loads(extra))
+
+    def iter_groups(self):
+        """Gera, em streaming, cada grupo com mais de uma imagem como lista de (caminho, hash, md5, extra)."""
+        n = self.count
+        self.meta_file.flush()
+        self.offsets_file.flush()
+
+        # Union-Find em disco se não couber em um quarto do orçamento
+        uf_bytes = n * (np.dtype(np.int64).itemsize + np.dtype(np.uint8).itemsize)
+        uf = ArrayUnionFind(n, self.work_dir if uf_bytes > self.memory_budget // 4 else None)
+
+        # Hashes idênticos primeiro; depois as sondagens de cada faixa sobre os hashes distintos
+        dtypes = (np.uint64, np.int64, np.uint8)
+        distinct = self._write_columns("distinct", self._distinct_hashes(uf), dtypes)
+        if distinct:
+            num_bands = self.num_bands or choose_num_bands(self.hash_bits, self.threshold, distinct,
+                                                           self.max_band_bits)
+            self.bands = hash_bands(self.hash_bits, num_bands)
+            radius = self.threshold // len(self.bands)
+            self.probes = [np.array(band_probe_masks(mask, radius), dtype=np.uint64) for _, mask in self.bands]
+            hashes, reps, originals = self._open_columns("distinct", dtypes, distinct)
+            for band_id in range(len(self.bands)):
+                self._union_band(uf, band_id, hashes, reps, originals)
+            del hashes, reps, originals
+
+        # Ordena (root, idx) externamente para emitir um grupo por vez
+        root_sorter = ExternalSorter(2, self.max_buffered, self.work_dir)
+        for i in range(n):
+            root_sorter.add((uf.find(i), i))
+
+        group = []
+        current_root = None
+        for root, idx in root_sorter.merged():
+            if root != current_root:
+                if len(group) > 1:
+                    yield [self._load(i) for i in group]
+                group = []
+                current_root = root
+            group.append(idx)
+        if len(group) > 1:
+            yield [self._load(i) for i in group]
+
+    def close(self):
+        """Remove os arquivos temporários."""
+        self.meta_file.close()
+        self.offsets_file.close()
+        self.tmp_dir.cleanup()
+
+class GroupStore:
+    """
+    Lista de grupos gravada em disco (JSON Lines + offsets), para exibir os grupos do modo de
+    baixa memória sem mantê-los na RAM. Funciona como uma sequência (len(), store[i], iteração)
+    de grupos no formato [(caminho, hash, md5), ...]; qualities(i) traz a qualidade de cada imagem.
+    """
+    def __init__(self, work_dir=None):
+        self.tmp_dir = tempfile.TemporaryDirectory(prefix="imagecleaner_groups_", dir=work_dir)
+        self.data_file = open(os.path.join(self.tmp_dir.name, "groups.jsonl"), "w+b")
+        self.offsets_file = open(os.path.join(self.tmp_dir.name, "offsets.bin"), "w+b")
+        self.offset_record = struct.Struct("<Q")
+        self.end = 0
+        self.count = 0
+
+    def append(self, group):
+        """Grava um grupo: lista de (caminho, hash, md5, qualidade)."""
+        self.offsets_file.seek(self.count * self.offset_record.size)
+        self.offsets_file.write(self.offset_record.pack(self.end))
+        self.data_file.seek(self.end)
+        self.data_file.write((json.dumps(group) + "\n").encode("ascii"))
+        self.end = self.data_file.tell()
+        self.count += 1
+
+    def _load(self, idx):
+        if idx < 0:
+            idx += self.count
+        if not 0 <= idx < self.count:
+            raise IndexError("grupo fora do intervalo")
+        self.offsets_file.seek(idx * self.offset_record.size)
+        (offset,) = self.offset_record.unpack(self.offsets_file.read(self.offset_record.size))
+        self.data_file.seek(offset)
+        return json.loads(self.data_file.readline())
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, idx):
+        return [(filepath, hash_int, md5_val) for filepath, hash_int, md5_val, _ in self._load(idx)]
+
+    def qualities(self, idx):
+        return [quality for _, _, _, quality in self._load(idx)]
+
+    def close(self):
+        """Remove os arquivos temporários."""
+        self.data_file.close()
+        self.offsets_file.close()
+        self.tmp_dir.cleanup()
+
 def get_file_md5(filepath):
     """
     Retorna o hash MD5 de um arquivo.
@@ -43,6 +845,646 @@ def get_file_md5(filepath):
             hash_md5.update(chunk)
     return hash_md5.hexdigest()
 
+def files_are_identical(path_a, path_b, chunk_size=65536):
+    """
+    Compara dois arquivos byte a byte.
+    Usado antes de substituir uma cópia por link, pois o MD5 sozinho não é prova de igualdade.
+    """
+    if os.path.getsize(path_a) != os.path.getsize(path_b):
+        return False
+    with open(path_a, "rb") as fa, open(path_b, "rb") as fb:
+        while True:
+            chunk_a = fa.read(chunk_size)
+            chunk_b = fb.read(chunk_size)
+            if chunk_a != chunk_b:
+                return False
+            if not chunk_a:
+                return True
+
+# ioctl FICLONE do Linux (clone copy-on-write em Btrfs, XFS, etc.)
+FICLONE = 0x40049409
+
+def try_reflink(src, dst):
+    """
+    Tenta criar dst como reflink (cópia copy-on-write) de src.
+    Retorna True se o sistema de arquivos suportar, False caso contrário.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return False  # Windows não possui fcntl
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        return True
+    except OSError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        return False
+
+def replace_with_link(keep_path, dup_path):
+    """
+    Substitui dup_path por um link para keep_path (reflink se suportado, senão hardlink).
+    Retorna uma tupla (método, bytes recuperados).
+    """
+    # lstat: um link simbólico não ocupa os dados do alvo, trocá-lo não libera nada
+    dup_stat = os.lstat(dup_path)
+    if stat.S_ISLNK(dup_stat.st_mode):
+        raise ValueError("A cópia é um link simbólico; nada a recuperar")
+
+    if os.path.samefile(keep_path, dup_path):
+        return "hardlink", 0  # Já apontam para o mesmo arquivo
+
+    if not files_are_identical(keep_path, dup_path):
+        raise ValueError("Arquivos não são idênticos byte a byte")
+
+    # Cria o link em um arquivo temporário na mesma pasta e troca de forma atômica
+    tmp_path = os.path.join(os.path.dirname(dup_path), f".{os.path.basename(dup_path)}.link_tmp")
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    if try_reflink(keep_path, tmp_path):
+        method = "reflink"
+        # Reflink é um arquivo independente: preserva as datas da cópia original
+        os.utime(tmp_path, (dup_stat.st_atime, dup_stat.st_mtime))
+    else:
+        os.link(keep_path, tmp_path)
+        method = "hardlink"
+
+    try:
+        os.replace(tmp_path, dup_path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+    # Se a cópia tinha outros hardlinks, os dados continuam ocupando espaço
+    reclaimed = dup_stat.st_size if dup_stat.st_nlink == 1 else 0
+    return method, reclaimed
+
+# Lado maior do proxy usado para medir a nitidez
+SHARPNESS_PROXY_SIZE = 256
+
+LIBRARY_VERSION = 1
+
+class ReferenceLibraryBuilder:
+    """
+    Constrói uma biblioteca de referência em disco, uma imagem por vez.
+    Em memória ficam apenas os hashes (8 bytes cada); caminhos e MD5 vão direto para o disco.
+    Sem num_bands, o número de faixas é escolhido em finish() pelo tamanho da biblioteca e pelo
+    threshold esperado nas consultas (choose_num_bands), para os buckets continuarem pequenos.
+    """
+    def __init__(self, library_dir, hash_bits=64, num_bands=None, threshold=10):
+        os.makedirs(library_dir, exist_ok=True)
+        self.library_dir = library_dir
+        self.hash_bits = hash_bits
+        self.num_bands = num_bands
+        self.threshold = threshold
+        # Remove o descritor antigo: a biblioteca só é válida depois de finish()
+        meta_path = os.path.join(library_dir, "library.json")
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        self.paths_file = open(os.path.join(library_dir, "paths.bin"), "wb")
+        self.path_offsets = array.array("Q")
+        self.entry_hashes = array.array("Q")
+        self.entry_images = array.array("q")
+        self.count = 0
+
+    def add(self, filepath, hash_int, md5_val, variants=None):
+        """Adiciona uma imagem; com variants, as 8 orientações entram no índice."""
+        payload = f"{filepath}\0{md5_val}".encode("utf-8", "surrogateescape")
+        self.path_offsets.append(self.paths_file.tell())
+        self.paths_file.write(struct.pack("<I", len(payload)) + payload)
+        for variant in (variants or [hash_int]):
+            self.entry_hashes.append(variant)
+            self.entry_images.append(self.count)
+        self.count += 1
+
+    def abort(self):
+        """Interrompe a construção (a biblioteca fica sem descritor, ou seja, inválida)."""
+        self.paths_file.close()
+
+    def finish(self):
+        """Ordena cada faixa do hash e grava o índice."""
+        self.paths_file.close()
+        hashes = np.frombuffer(self.entry_hashes, dtype=np.uint64)
+        np.save(os.path.join(self.library_dir, "hashes.npy"), hashes)
+        np.save(os.path.join(self.library_dir, "images.npy"), np.frombuffer(self.entry_images, dtype=np.int64))
+        np.save(os.path.join(self.library_dir, "path_offsets.npy"), np.frombuffer(self.path_offsets, dtype=np.uint64))
+
+        if self.num_bands is None:
+            self.num_bands = choose_num_bands(self.hash_bits, self.threshold, len(hashes))
+        for band_id, (shift, mask) in enumerate(hash_bands(self.hash_bits, self.num_bands)):
+            values, order, starts = sort_band(hashes, shift, mask)
+            np.save(os.path.join(self.library_dir, f"band{band_id}_values.npy"), values)
+            np.save(os.path.join(self.library_dir, f"band{band_id}_order.npy"), order)
+            np.save(os.path.join(self.library_dir, f"band{band_id}_starts.npy"), starts)
+
+        # Descritor gravado por último: marca a biblioteca como completa
+        with open(os.path.join(self.library_dir, "library.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                'version': LIBRARY_VERSION,
+                'hash_bits': self.hash_bits,
+                'num_bands': self.num_bands,
+                'count': self.count,
+                'entries': len(self.entry_hashes),
+            }, f)
+
+class ReferenceLibrary:
+    """
+    Biblioteca de referência persistente (multi-index hashing em arrays NumPy ordenados).
+    Os arrays são abertos com mmap; cada faixa tem uma tabela com o início de cada bucket, então
+    sondar um bucket é um acesso direto, e os candidatos são verificados de uma vez com NumPy. Como a largura das faixas acompanha o tamanho da
+    biblioteca, o número de candidatos por consulta fica pequeno mesmo com milhões de entradas.
+    """
+    def __init__(self, library_dir):
+        meta_path = os.path.join(library_dir, "library.json")
+        if not os.path.exists(meta_path):
+            raise ValueError("Pasta não contém uma biblioteca de referência completa")
+        with open(meta_path, "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta['version'] != LIBRARY_VERSION:
+            raise ValueError(f"Versão de biblioteca não suportada: {self.meta['version']}")
+
+        self.library_dir = library_dir
+        self.bands = hash_bands(self.meta['hash_bits'], self.meta['num_bands'])
+        load = lambda name: np.load(os.path.join(library_dir, name), mmap_mode="r")
+        self.hashes = load("hashes.npy")
+        self.images = load("images.npy")
+        self.path_offsets = load("path_offsets.npy")
+        self.band_order = [load(f"band{band_id}_order.npy") for band_id in range(len(self.bands))]
+        self.band_starts = []
+        for band_id, (_, mask) in enumerate(self.bands):
+            if os.path.exists(os.path.join(library_dir, f"band{band_id}_starts.npy")):
+                self.band_starts.append(load(f"band{band_id}_starts.npy"))
+            else:
+                # Biblioteca gravada antes das tabelas de início dos buckets
+                values = load(f"band{band_id}_values.npy")
+                self.band_starts.append(np.searchsorted(values, np.arange(mask + 2, dtype=np.uint64)))
+        self.paths_file = open(os.path.join(library_dir, "paths.bin"), "rb")
+        self.probe_cache = {}
+
+    def __len__(self):
+        return self.meta['count']
+
+    def _probes(self, band_id, radius):
+        key = (band_id, radius)
+        if key not in self.probe_cache:
+            _, mask = self.bands[band_id]
+            self.probe_cache[key] = np.array(band_probe_masks(mask, radius), dtype=np.uint64)
+        return self.probe_cache[key]
+
+    def load_entry(self, image_idx):
+        """Retorna (caminho, md5) de uma imagem da biblioteca."""
+        self.paths_file.seek(int(self.path_offsets[image_idx]))
+        (length,) = struct.unpack("<I", self.paths_file.read(4))
+        filepath, md5_val = self.paths_file.read(length).decode("utf-8", "surrogateescape").split("\0")
+        return filepath, md5_val
+
+    def query(self, hashes, threshold, max_results=5):
+        """
+        Busca as imagens da biblioteca a até threshold bits de qualquer um dos hashes.
+        Retorna até max_results tuplas (caminho, md5, distância), da mais próxima para a mais distante.
+        """
+        radius = threshold // len(self.bands)
+        query_hashes = np.array(hashes, dtype=np.uint64)
+        candidates = []
+        for band_id, (shift, mask) in enumerate(self.bands):
+            keys = (((query_hashes >> np.uint64(shift)) & np.uint64(mask))[:, None]
+                    ^ self._probes(band_id, radius)[None, :]).ravel()
+            starts = self.band_starts[band_id]
+            _, positions = expand_ranges(starts[keys], starts[keys + np.uint64(1)])
+            candidates.append(self.band_order[band_id][positions])
+
+        # Cada entrada candidata é comparada uma vez com todos os hashes da consulta
+        entries = np.unique(np.concatenate(candidates))
+        distances = popcount64(self.hashes[entries][:, None] ^ query_hashes[None, :]).min(axis=1)
+        close = distances <= threshold
+
+        # Menor distância de cada imagem da biblioteca (as 8 orientações são entradas separadas)
+        images, distances = closest_per_owner(self.images[entries[close]], distances[close])
+        return [(*self.load_entry(int(image)), int(distance))
+                for image, distance in zip(images[:max_results], distances[:max_results])]
+
+    def close(self):
+        self.paths_file.close()
+
+# Quantidade de bytes lidos do início do arquivo para identificar o formato
+# (cobre a caixa ftyp do HEIF/AVIF com a lista de marcas compatíveis)
+SNIFF_BYTES = 128
+
+# Formato -> lista de alternativas; cada alternativa é uma lista de (offset, bytes mágicos)
+FORMAT_SIGNATURES = {
+    "JPEG": [[(0, b"\xff\xd8\xff")]],
+    "PNG": [[(0, b"\x89PNG\r\n\x1a\n")]],
+    "GIF": [[(0, b"GIF87a")], [(0, b"GIF89a")]],
+    "BMP": [[(0, b"BM")]],
+    "WEBP": [[(0, b"RIFF"), (8, b"WEBP")]],
+    "TIFF": [[(0, b"II*\x00")], [(0, b"MM\x00*")]],
+}
+
+# Formatos do ISO BMFF (caixa ftyp): formato -> marcas (brands) específicas
+FTYP_BRANDS = {
+    "AVIF": [b"avif", b"avis"],
+    "HEIC": [b"heic", b"heix", b"hevc", b"hevx", b"heim", b"heis"],
+}
+# Marcas genéricas do HEIF, usadas também por AVIF: só decidem o formato sem marca específica
+FTYP_GENERIC_BRANDS = {
+    "HEIC": [b"mif1", b"msf1"],
+}
+
+# Extensões escaneadas de cada formato (o formato real é decidido pela assinatura)
+FORMAT_EXTENSIONS = {
+    "JPEG": [".jpg", ".jpeg", ".jpe", ".jfif"],
+    "PNG": [".png", ".apng"],
+    "GIF": [".gif"],
+    "BMP": [".bmp", ".dib"],
+    "WEBP": [".webp"],
+    "TIFF": [".tif", ".tiff"],
+    "HEIC": [".heic", ".heif"],
+    "AVIF": [".avif"],
+}
+
+# Pacote opcional que adiciona suporte a cada formato ao PIL
+FORMAT_PLUGINS = {
+    "HEIC": "pillow-heif",
+    "AVIF": "pillow-avif-plugin",
+}
+
+# Formato -> função que abre o arquivo e retorna um PIL.Image pronto para o hash
+FORMAT_DECODERS = {}
+
+class ImageScanError(Exception):
+    """Erro de escaneamento já categorizado (formato rejeitado, tempo esgotado etc.)."""
+    def __init__(self, error_type, message):
+        # Ambos em args para o erro sobreviver ao pickle entre processos
+        super().__init__(error_type, message)
+        self.error_type = error_type
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+def ftyp_format(head):
+    """
+    Formato de um arquivo ISO BMFF pela caixa ftyp: a marca principal e depois as compatíveis.
+    Um AVIF pode ter a marca principal mif1 (genérica do HEIF) e avif só entre as compatíveis.
+    """
+    (box_size,) = struct.unpack(">I", head[:4])
+    box_end = min(box_size, len(head)) if box_size >= 16 else len(head)
+    brands = [head[8:12]] + [head[i:i + 4] for i in range(16, box_end - 3, 4)]
+    for brand_table in (FTYP_BRANDS, FTYP_GENERIC_BRANDS):
+        for brand in brands:
+            for fmt, fmt_brands in brand_table.items():
+                if brand in fmt_brands:
+                    return fmt
+    return None
+
+def sniff_format(filepath):
+    """Identifica o formato pelos bytes mágicos do início do arquivo (None se desconhecido)."""
+    with open(filepath, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+    for fmt, alternatives in FORMAT_SIGNATURES.items():
+        for checks in alternatives:
+            if all(head[offset:offset + len(magic)] == magic for offset, magic in checks):
+                return fmt
+    if head[4:8] == b"ftyp":
+        return ftyp_format(head)
+    return None
+
+def open_with_pil(filepath):
+    """Decodificador padrão: PIL."""
+    return Image.open(filepath)
+
+def open_jpeg_draft(filepath):
+    """
+    JPEG em modo draft: o libjpeg decodifica já reduzido (até 1/8) e em tons de cinza,
+    pois o pHash e a nitidez só usam proxies pequenos.
+    """
+    img = Image.open(filepath)
+    img.original_size = img.size  # draft reduz img.size; guarda as dimensões reais
+    img.draft("L", (SHARPNESS_PROXY_SIZE, SHARPNESS_PROXY_SIZE))
+    return img
+
+def register_decoder(fmt, opener):
+    """Registra (ou substitui) o decodificador de um formato."""
+    FORMAT_DECODERS[fmt] = opener
+
+def register_default_decoders():
+    """
+    Registra o PIL para os formatos nativos e os plugins opcionais que estiverem instalados.
+    Chamado na primeira decodificação (não no import); não substitui decodificadores já registrados.
+    """
+    global default_decoders_registered
+    if default_decoders_registered:
+        return
+    default_decoders_registered = True
+
+    defaults = {"PNG": open_with_pil, "GIF": open_with_pil, "BMP": open_with_pil,
+                "TIFF": open_with_pil, "JPEG": open_jpeg_draft}
+
+    if features.check("webp"):
+        defaults["WEBP"] = open_with_pil
+
+    try:
+        import pillow_heif
+        pillow_heif.register_heif_opener()
+        defaults["HEIC"] = open_with_pil
+    except ImportError:
+        pass
+
+    try:
+        import pillow_avif  # noqa: F401 (registra o plugin no import)
+        defaults["AVIF"] = open_with_pil
+    except ImportError:
+        pass
+
+    for fmt, opener in defaults.items():
+        FORMAT_DECODERS.setdefault(fmt, opener)
+
+default_decoders_registered = False
+
+def open_image(filepath):
+    """
+    Identifica o formato pela assinatura e abre com o decodificador registrado.
+    Retorna (formato, imagem); arquivos desconhecidos são rejeitados sem chamar o PIL.
+    """
+    fmt = sniff_format(filepath)
+    if fmt is None:
+        raise ImageScanError("Formato Inválido",
+                             "Arquivo não é uma imagem válida ou formato não suportado")
+    register_default_decoders()
+    decoder = FORMAT_DECODERS.get(fmt)
+    if decoder is None:
+        plugin = FORMAT_PLUGINS.get(fmt)
+        hint = f" (instale o pacote {plugin})" if plugin else ""
+        raise ImageScanError("Sem Decodificador",
+                             f"Formato {fmt} detectado, mas nenhum decodificador está disponível{hint}")
+    return fmt, decoder(filepath)
+
+def quality_features(img, gray, file_size):
+    """
+    Características baratas de qualidade, calculadas sobre a imagem já decodificada:
+    dimensões, bytes por pixel, nitidez (variância do Laplaciano no proxy reduzido) e EXIF.
+    """
+    width, height = getattr(img, "original_size", img.size)
+    # Todos os proxies com o mesmo lado maior, para a nitidez ser comparável entre cópias
+    # (cópias de baixa resolução são ampliadas e perdem nitidez, como esperado)
+    scale = SHARPNESS_PROXY_SIZE / max(gray.size)
+    proxy = gray.resize((max(1, round(gray.width * scale)), max(1, round(gray.height * scale))), Image.BILINEAR)
+    pixels = np.asarray(proxy, dtype=np.float32)
+    if pixels.shape[0] >= 3 and pixels.shape[1] >= 3:
+        laplacian = (pixels[:-2, 1:-1] + pixels[2:, 1:-1] + pixels[1:-1, :-2] + pixels[1:-1, 2:]
+                     - 4 * pixels[1:-1, 1:-1])
+        sharpness = float(laplacian.var())
+    else:
+        sharpness = 0.0
+    return {
+        'width': width,
+        'height': height,
+        'bytes_per_pixel': file_size / max(width * height, 1),
+        'sharpness': sharpness,
+        'has_exif': len(img.getexif()) > 0,
+    }
+
+def image_pixels(img_info):
+    """Número de pixels da imagem (0 se a qualidade não foi medida)."""
+    quality = img_info.get('quality') or {}
+    return quality.get('width', 0) * quality.get('height', 0)
+
+def image_quality_value(img_info, feature):
+    """Valor de uma característica de qualidade (0 se não foi medida)."""
+    return (img_info.get('quality') or {}).get(feature, 0)
+
+# Critérios para escolher a imagem mantida: chave de ordenação em que a melhor vem primeiro.
+# Empates são decididos pela mais antiga.
+KEEPER_POLICIES = {
+    "Mais antiga": lambda info: (info['mtime'],),
+    "Maior resolução": lambda info: (-image_pixels(info), info['mtime']),
+    "Mais nítida": lambda info: (-image_quality_value(info, 'sharpness'), info['mtime']),
+    "Menos comprimida": lambda info: (-image_quality_value(info, 'bytes_per_pixel'), info['mtime']),
+    "Com EXIF": lambda info: (not image_quality_value(info, 'has_exif'), info['mtime']),
+    "Melhor qualidade": lambda info: (
+        -image_pixels(info),
+        not image_quality_value(info, 'has_exif'),
+        -image_quality_value(info, 'sharpness'),
+        -image_quality_value(info, 'bytes_per_pixel'),
+        info['mtime'],
+    ),
+}
+
+def categorize_scan_error(e):
+    """Retorna (tipo, mensagem) legíveis para um erro ao processar uma imagem."""
+    error_type = "Desconhecido"
+    error_msg = str(e)
+
+    if isinstance(e, ImageScanError):
+        error_type = e.error_type
+    elif "truncated" in error_msg.lower():
+        error_type = "Arquivo Truncado"
+        error_msg = "Imagem incompleta ou corrompida (dados faltando)"
+    elif "broken data stream" in error_msg.lower():
+        error_type = "Dados Corrompidos"
+        error_msg = "Fluxo de dados da imagem está quebrado"
+    elif "cannot identify image file" in error_msg.lower():
+        error_type = "Formato Inválido"
+        error_msg = "Arquivo não é uma imagem válida ou formato não suportado"
+    elif "permission" in error_msg.lower():
+        error_type = "Sem Permissão"
+        error_msg = "Sem permissão para ler o arquivo"
+
+    return error_type, error_msg
+
+def compute_image_hashes(filepath, detect_rotations=False):
+    """
+    Decodifica uma imagem e calcula seus hashes (roda no processo de decodificação).
+    Retorna um dict com formato, pHash (int), orientações, quadros-chave, qualidade e tempos.
+    """
+    hash_start = time.perf_counter()
+    variants = None
+    signature = None
+    orientation_seconds = 0.0
+    fmt, img = open_image(filepath)
+    with img:
+        if getattr(img, "is_animated", False):
+            # Animação: assinatura com os quadros-chave (o primeiro é o quadro 0)
+            signature = frame_signature(img)
+        # Tons de cinza convertidos uma vez, usados no pHash (ou nas orientações) e na nitidez
+        gray = img.convert("L")
+        if detect_rotations:
+            # Uma única DCT do proxy 32x32 gera as 8 orientações
+            dct_lowfreq = phash_dct_lowfreq(img, gray)
+            orientation_start = time.perf_counter()
+            variants = dihedral_phashes(dct_lowfreq)
+            orientation_seconds = time.perf_counter() - orientation_start
+            hash_int = variants[0]
+        elif signature:
+            hash_int = signature[0]
+        else:
+            hash_int = phash_to_int(imagehash.phash(gray))
+        quality = quality_features(img, gray, os.path.getsize(filepath))
+    return {
+        'format': fmt,
+        'hash': hash_int,
+        'variants': variants,
+        'signature': signature,
+        'quality': quality,
+        'hash_seconds': time.perf_counter() - hash_start,
+        'orientation_seconds': orientation_seconds,
+    }
+
+class DecodeWorker:
+    """
+    Executa a decodificação em um processo separado, com tempo limite por arquivo.
+    Se um decodificador travar ou derrubar o processo, ele é encerrado e recriado,
+    e apenas aquele arquivo é marcado com erro.
+    """
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self.pool = None
+
+    def submit(self, func, args, callback=None, error_callback=None):
+        """Envia func(*args) ao processo (recriado se necessário) sem aguardar o resultado."""
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(1)
+        return self.pool.apply_async(func, args, callback=callback, error_callback=error_callback)
+
+    def run(self, func, args, on_wait=None, poll_interval=0.1):
+        """Executa func(*args) no processo; on_wait é chamado enquanto aguarda (ex.: atualizar a interface)."""
+        result = self.submit(func, args)
+        deadline = time.monotonic() + self.timeout
+        while not result.ready():
+            if time.monotonic() >= deadline:
+                self.kill()
+                raise ImageScanError("Tempo Esgotado",
+                                     f"Decodificação excedeu {self.timeout} s (decodificador travado ou arquivo patológico)")
+            result.wait(poll_interval)
+            if on_wait:
+                on_wait()
+        return result.get()
+
+    def kill(self):
+        """Encerra o processo imediatamente."""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+CHECKPOINT_DIR = os.path.join(os.path.expanduser("~"), ".imagecleaner", "checkpoints")
+CHECKPOINT_VERSION = 1
+
+class ScanCheckpoint:
+    """
+    Checkpoint write-ahead de um escaneamento, em JSON Lines (apenas acrescenta).
+    Os resultados são gravados em lotes de batch_size arquivos e sincronizados com fsync
+    no máximo a cada fsync_interval segundos. Uma linha incompleta no fim (queda no meio
+    da escrita) é ignorada ao retomar e cortada do arquivo antes de acrescentar.
+    Em memória fica só caminho -> (tamanho, mtime, offset); o registro completo é lido do disco.
+    """
+    def __init__(self, folder, options, batch_size=100, fsync_interval=5.0):
+        self.options = dict(options, folder=os.path.abspath(folder), version=CHECKPOINT_VERSION)
+        folder_key = hashlib.md5(self.options['folder'].encode("utf-8", "surrogateescape")).hexdigest()
+        self.path = os.path.join(CHECKPOINT_DIR, f"{folder_key}.jsonl")
+        self.batch_size = batch_size
+        self.fsync_interval = fsync_interval
+        self.buffer = []
+        self.file = None
+        self.reader = None
+        self.valid_end = 0  # Fim (em bytes) da última linha completa lida por load()
+        self.last_fsync = time.monotonic()
+
+    def load(self):
+        """
+        Retorna {caminho: (tamanho, mtime, offset)} do checkpoint anterior, se for do mesmo
+        escaneamento; o registro completo de cada caminho é obtido com read(offset).
+        """
+        self.valid_end = 0
+        if not os.path.exists(self.path):
+            return {}
+        index = {}
+        with open(self.path, "rb") as f:
+            header_line = f.readline()
+            try:
+                header = json.loads(header_line)
+            except ValueError:
+                return {}
+            if header != self.options or not header_line.endswith(b"\n"):
+                return {}
+            offset = len(header_line)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Linha incompleta: o restante não foi confirmado
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                index[record['path']] = (record['size'], record['mtime'], offset)
+                offset += len(line)
+        self.valid_end = offset
+        return index
+
+    def read(self, offset):
+        """Lê o registro completo gravado em offset (retornado por load)."""
+        if self.reader is None:
+            self.reader = open(self.path, "rb")
+        self.reader.seek(offset)
+        return json.loads(self.reader.readline())
+
+    def open(self, resume):
+        """Abre para acrescentar (resume=True, após load) ou começa um checkpoint novo."""
+        os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+        if resume:
+            # Corta a linha incompleta do fim; senão o próximo registro seria colado nela
+            os.truncate(self.path, self.valid_end)
+            self.file = open(self.path, "a", encoding="utf-8", errors="surrogateescape")
+        else:
+            self.file = open(self.path, "w", encoding="utf-8", errors="surrogateescape")
+            self.file.write(json.dumps(self.options) + "\n")
+            self.flush(force_fsync=True)
+
+    def append(self, record):
+        self.buffer.append(record)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self, force_fsync=False):
+        """Grava o lote pendente; faz fsync se o intervalo já passou (ou se forçado)."""
+        if self.file is None:
+            return
+        if self.buffer:
+            self.file.write("".join(json.dumps(record) + "\n" for record in self.buffer))
+            self.buffer = []
+        self.file.flush()
+        if force_fsync or time.monotonic() - self.last_fsync >= self.fsync_interval:
+            os.fsync(self.file.fileno())
+            self.last_fsync = time.monotonic()
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+        if self.file is not None:
+            self.flush(force_fsync=True)
+            self.file.close()
+            self.file = None
+
+    def remove(self):
+        """Descarta o checkpoint (escaneamento concluído)."""
+        self.buffer = []
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
 class ImageCleaner:
     def __init__(self, master):
         self.master = master
@@ -54,6 +1496,24 @@ class ImageCleaner:
         self.groups_per_page = 10
         self.group_check_vars = {}  # Armazena check_vars por grupo
         self.scan_errors = []  # Armazena erros de escaneamento
+        self.memory_budget_mb = 256  # Orçamento de memória do modo de baixa memória
+        self.dihedral_hashes = {}  # pHash das 8 orientações por caminho (modo de rotação)
+        self.frame_signatures = {}  # pHash dos quadros-chave por caminho (animações)
+        self.image_quality = {}  # Características de qualidade por caminho
+        self.keeper_policy = "Mais antiga"  # Critério da imagem mantida em cada grupo
+        self.scan_mode = "group"  # group | build_library | query_library
+        self.library_dir = ""  # Pasta da biblioteca de referência
+        self.reference_library = None
+        self.library_threshold = 10  # Distância máxima para considerar que já existe na biblioteca
+        self.library_matches = []  # (caminho, md5, [(caminho na biblioteca, md5, distância)])
+        self.scan_stats = {}  # Estatísticas de tempo do último escaneamento
+        self.checkpoint_batch_size = 100  # Arquivos por lote gravado no checkpoint
+        self.checkpoint_fsync_interval = 5.0  # Segundos entre fsyncs do checkpoint
+        self.decode_timeout = 30  # Tempo máximo (s) para decodificar um arquivo
+        self.scanning = False
+        self.scan_cancelled = False
+        self.close_requested = False
+        self.master.protocol("WM_DELETE_WINDOW", self.on_close)
         self.create_widgets()
 
     def create_widgets(self):
@@ -86,10 +1546,65 @@ class ImageCleaner:
                            "e todas as suas subpastas recursivamente.\n"
                            "Se desmarcado, apenas a pasta raiz será escaneada.")
 
+        # Checkbox para o modo de baixa memória (desmarcada por padrão)
+        self.low_memory_var = tk.IntVar(value=0)
+        self.low_memory_check = tk.Checkbutton(
+            self.subfolder_frame,
+            text="Modo de baixa memória",
+            variable=self.low_memory_var
+        )
+        self.low_memory_check.pack(side="left", padx=(15, 0))
+
+        self.low_memory_info_label = tk.Label(self.subfolder_frame, text="ℹ️", fg="blue", cursor="hand2")
+        self.low_memory_info_label.pack(side="left", padx=5)
+
+        self.create_tooltip(self.low_memory_info_label,
+                           "Para acervos muito grandes que não cabem na memória.\n"
+                           "Os hashes são gravados em arquivos temporários no disco\n"
+                           f"e o agrupamento usa no máximo ~{self.memory_budget_mb} MB de RAM.")
+
+        # Checkbox para detectar cópias rotacionadas/espelhadas (desmarcada por padrão)
+        self.rotation_var = tk.IntVar(value=0)
+        self.rotation_check = tk.Checkbutton(
+            self.subfolder_frame,
+            text="Detectar rotações/espelhamentos",
+            variable=self.rotation_var
+        )
+        self.rotation_check.pack(side="left", padx=(15, 0))
+
+        self.rotation_info_label = tk.Label(self.subfolder_frame, text="ℹ️", fg="blue", cursor="hand2")
+        self.rotation_info_label.pack(side="left", padx=5)
+
+        self.create_tooltip(self.rotation_info_label,
+                           "Considera semelhantes imagens giradas em 90°/180°/270°\n"
+                           "ou espelhadas (ex.: fotos exportadas do celular).\n"
+                           "A orientação EXIF também é respeitada.")
+
         # Botão Iniciar (inicialmente oculto)
         self.start_btn = tk.Button(self.master, text="Iniciar", command=self.start_scan)
+
+        # Botões da biblioteca de referência (inicialmente ocultos)
+        self.library_frame = tk.Frame(self.master)
+        tk.Button(self.library_frame, text="Criar Biblioteca de Referência",
+                  command=self.start_library_build).pack(side="left", padx=5)
+        tk.Button(self.library_frame, text="Comparar com Biblioteca",
+                  command=self.start_library_query).pack(side="left", padx=5)
         # Não exibe o botão nem o frame de subpastas inicialmente
 
+    def on_close(self):
+        """Fecha o programa; durante um escaneamento, primeiro salva o checkpoint"""
+        if self.scanning:
+            self.cancel_scan()
+            self.close_requested = True
+        else:
+            self.master.destroy()
+
+    def cancel_scan(self):
+        """Interrompe o escaneamento após o arquivo atual (o progresso fica no checkpoint)"""
+        self.scan_cancelled = True
+        if hasattr(self, 'progress_label') and self.progress_label.winfo_exists():
+            self.progress_label.config(text="Cancelando e salvando checkpoint...")
+
     def create_tooltip(self, widget, text):
         """Cria um tooltip para um widget"""
         def on_enter(event):
@@ -119,19 +1634,44 @@ class ImageCleaner:
             self.path_label.config(text=f"Pasta selecionada: {folder}")
             self.subfolder_frame.pack(pady=5)
             self.start_btn.pack(pady=10)
+            self.library_frame.pack(pady=(0, 10))
 
-    def start_scan(self):
+    def start_scan(self, mode="group"):
         """Inicia o escaneamento quando o usuário clicar no botão Iniciar"""
         if self.selected_folder:
+            self.scan_mode = mode
             self.create_progress_window()
             # Agenda o scan para depois que a janela for criada
             self.master.after(100, self.scan_folder)
 
+    def start_library_build(self):
+        """Escaneia a pasta selecionada e grava uma biblioteca de referência"""
+        library_dir = filedialog.askdirectory(title="Selecione a pasta onde a biblioteca será salva")
+        if library_dir:
+            self.library_dir = library_dir
+            self.start_scan(mode="build_library")
+
+    def start_library_query(self):
+        """Escaneia a pasta selecionada e procura cada imagem em uma biblioteca existente"""
+        library_dir = filedialog.askdirectory(title="Selecione a pasta da biblioteca de referência")
+        if not library_dir:
+            return
+        try:
+            library = ReferenceLibrary(library_dir)
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao abrir a biblioteca: {e}")
+            return
+        if self.reference_library is not None:
+            self.reference_library.close()
+        self.reference_library = library
+        self.library_dir = library_dir
+        self.start_scan(mode="query_library")
+
     def create_progress_window(self):
         """Cria janela de progresso"""
         self.progress_window = tk.Toplevel(self.master)
         self.progress_window.title("Escaneando Imagens")
-        self.progress_window.geometry("500x150")
+        self.progress_window.geometry("500x190")
         self.progress_window.resizable(False, False)
 
         # Centraliza a janela
@@ -154,6 +1694,10 @@ class ImageCleaner:
         self.progress_count_label = tk.Label(main_frame, text="0 / 0 imagens", font=("Arial", 9))
         self.progress_count_label.pack(pady=(5, 0))
 
+        # Botão cancelar (fechar a janela tem o mesmo efeito)
+        tk.Button(main_frame, text="Cancelar", command=self.cancel_scan).pack(pady=(5, 0))
+        self.progress_window.protocol("WM_DELETE_WINDOW", self.cancel_scan)
+
     def update_progress(self, current, total, filename):
         """Atualiza a barra de progresso"""
         if hasattr(self, 'progress_window') and self.progress_window.winfo_exists():
@@ -171,7 +1715,12 @@ class ImageCleaner:
     def scan_folder(self):
         self.images_data = []
         self.scan_errors = []  # Reseta lista de erros
-        valid_extensions = [".jpg", ".jpeg", ".png", ".bmp", ".gif"]
+        self.dihedral_hashes = {}
+        self.frame_signatures = {}
+        self.image_quality = {}
+        self.scan_stats = {'hashed_images': 0, 'hash_seconds': 0.0, 'orientation_seconds': 0.0,
+                           'animated_files': 0, 'keyframes': 0, 'formats': {}, 'resumed_files': 0}
+        valid_extensions = [ext for extensions in FORMAT_EXTENSIONS.values() for ext in extensions]
 
         total_files = 0
         processed_files = 0
@@ -179,6 +1728,10 @@ class ImageCleaner:
         # Verifica se deve escanear subpastas
         scan_subfolders = self.scan_subfolders_var.get() == 1
 
+        # Verifica se deve detectar rotações/espelhamentos
+        detect_rotations = self.rotation_var.get() == 1
+        self.scan_stats['detect_rotations'] = detect_rotations
+
         # Primeira passagem: contar total de arquivos
         self.progress_label.config(text="Contando arquivos...")
         self.progress_window.update()
@@ -210,69 +1763,216 @@ class ImageCleaner:
             messagebox.showinfo("Resultado", "Nenhuma imagem encontrada.")
             return
 
+        # No modo de baixa memória os hashes vão direto para o disco
+        grouper = None
+        if self.scan_mode == "group" and self.low_memory_var.get() == 1:
+            grouper = StreamingGrouper(threshold=10, memory_budget_mb=self.memory_budget_mb)
+
+        # Biblioteca de referência: grava o índice ou consulta cada imagem
+        library_builder = None
+        if self.scan_mode == "build_library":
+            library_builder = ReferenceLibraryBuilder(self.library_dir)
+        self.library_matches = []
+
+        # Checkpoint para retomar o escaneamento após queda ou cancelamento
+        checkpoint = ScanCheckpoint(
+            self.selected_folder,
+            {'subfolders': scan_subfolders, 'rotations': detect_rotations},
+            batch_size=self.checkpoint_batch_size,
+            fsync_interval=self.checkpoint_fsync_interval
+        )
+        done_records = checkpoint.load()
+        resume = bool(done_records) and messagebox.askyesno(
+            "Retomar Escaneamento",
+            f"Foi encontrado um escaneamento interrompido desta pasta com "
+            f"{len(done_records)} arquivos já processados.\n\nDeseja continuar de onde parou?"
+        )
+        if not resume:
+            done_records = {}
+        checkpoint.open(resume)
+
+        # Decodificação isolada em outro processo, com tempo limite por arquivo
+        worker = DecodeWorker(self.decode_timeout)
+
+        def store_result(record):
+            """Guarda o resultado de uma imagem (nova ou retomada do checkpoint)"""
+            nonlocal processed_files
+            filepath = record['path']
+            processed_files += 1  # Conta mesmo com erro
+            if 'error' in record:
+                self.scan_errors.append({
+                    'filepath': filepath,
+                    'type': record['error']['type'],
+                    'message': record['error']['message']
+                })
+                return
+
+            result = record['result']
+            hash_val = imagehash.hex_to_hash(f"{result['hash']:016x}")
+            variants = result['variants']
+            signature = result['signature']
+            # Armazena tupla com (caminho, p-hash, md5)
+            if library_builder is not None:
+                library_builder.add(filepath, result['hash'], record['md5'], variants=variants)
+            elif self.scan_mode == "query_library":
+                matches = self.reference_library.query(variants or [result['hash']], self.library_threshold)
+                self.library_matches.append((filepath, record['md5'], matches))
+            elif grouper is not None:
+                grouper.add(filepath, result['hash'], record['md5'], variants=variants, extra=result['quality'])
+            else:
+                self.images_data.append((filepath, hash_val, record['md5']))
+                self.image_quality[filepath] = result['quality']
+                if variants is not None:
+                    self.dihedral_hashes[filepath] = variants
+                if signature and len(signature) > 1:
+                    self.frame_signatures[filepath] = signature
+            if signature:
+                self.scan_stats['animated_files'] += 1
+                self.scan_stats['keyframes'] += len(signature)
+
+        def keep_ui_alive():
+            """Mantém a janela responsiva (e o botão Cancelar) enquanto um arquivo é decodificado"""
+            if hasattr(self, 'progress_window') and self.progress_window.winfo_exists():
+                self.progress_window.update()
+
         # Segunda passagem: processar arquivos
         def process_image(filepath):
             """Processa uma imagem e categoriza erros se houver"""
-            nonlocal processed_files
             try:
-                # Calcula perceptual hash
-                with Image.open(filepath) as img:
-                    hash_val = imagehash.phash(img)
+                file_stat = os.stat(filepath)
+            except OSError:
+                file_stat = None
+            record = {
+                'path': filepath,
+                'size': file_stat.st_size if file_stat else None,
+                'mtime': file_stat.st_mtime if file_stat else None,
+            }
+
+            # Arquivo já processado em um escaneamento anterior e não modificado
+            done = done_records.get(filepath)
+            if done is not None and done[0] == record['size'] and done[1] == record['mtime']:
+                done = checkpoint.read(done[2])
+                self.scan_stats['resumed_files'] += 1
+                store_result(done)
+                return 'error' not in done
+
+            try:
+                # Calcula perceptual hash (no processo de decodificação)
+                result = worker.run(compute_image_hashes, (filepath, detect_rotations), on_wait=keep_ui_alive)
+                self.scan_stats['orientation_seconds'] += result['orientation_seconds']
+                self.scan_stats['hash_seconds'] += result['hash_seconds']
+                self.scan_stats['hashed_images'] += 1
+                # Vazão de decodificação por formato: [arquivos, segundos, bytes]
+                format_stats = self.scan_stats['formats'].setdefault(result['format'], [0, 0.0, 0])
+                format_stats[0] += 1
+                format_stats[1] += result['hash_seconds']
+                format_stats[2] += record['size'] or 0
                 # Calcula MD5 para detectar arquivos idênticos
-                md5_val = get_file_md5(filepath)
-                # Armazena tupla com (caminho, p-hash, md5)
-                self.images_data.append((filepath, hash_val, md5_val))
-                processed_files += 1
-                return True
+                record['md5'] = get_file_md5(filepath)
+                record['result'] = result
+                success = True
             except Exception as e:
                 # Categoriza o erro
-                error_type = "Desconhecido"
-                error_msg = str(e)
-
-                if "truncated" in error_msg.lower():
-                    error_type = "Arquivo Truncado"
-                    error_msg = "Imagem incompleta ou corrompida (dados faltando)"
-                elif "broken data stream" in error_msg.lower():
-                    error_type = "Dados Corrompidos"
-                    error_msg = "Fluxo de dados da imagem está quebrado"
-                elif "cannot identify image file" in error_msg.lower():
-                    error_type = "Formato Inválido"
-                    error_msg = "Arquivo não é uma imagem válida ou formato não suportado"
-                elif "permission" in error_msg.lower():
-                    error_type = "Sem Permissão"
-                    error_msg = "Sem permissão para ler o arquivo"
-                else:
-                    error_msg = str(e)
+                error_type, error_msg = categorize_scan_error(e)
+                record['error'] = {'type': error_type, 'message': error_msg}
+                success = False
 
-                self.scan_errors.append({
-                    'filepath': filepath,
-                    'type': error_type,
-                    'message': error_msg
-                })
-                processed_files += 1  # Conta mesmo com erro
-                return False
+            checkpoint.append(record)
+            store_result(record)
+            return success
 
         # Processa cada arquivo com atualização de progresso
-        for idx, filepath in enumerate(file_list, 1):
-            process_image(filepath)
-            self.update_progress(idx, total_files, filepath)
+        self.scanning = True
+        self.scan_cancelled = False
+        try:
+            for idx, filepath in enumerate(file_list, 1):
+                if self.scan_cancelled:
+                    break
+                process_image(filepath)
+                self.update_progress(idx, total_files, filepath)
+        finally:
+            self.scanning = False
+            worker.close()
+            checkpoint.close()
 
         # Fecha janela de progresso
         if hasattr(self, 'progress_window') and self.progress_window.winfo_exists():
             self.progress_window.destroy()
 
+        if self.scan_cancelled:
+            # Mantém o checkpoint para a próxima execução
+            if grouper is not None:
+                grouper.close()
+            if library_builder is not None:
+                library_builder.abort()
+            if self.close_requested:
+                self.master.destroy()
+            else:
+                messagebox.showinfo(
+                    "Escaneamento Interrompido",
+                    f"{processed_files} de {total_files} arquivos foram salvos no checkpoint.\n"
+                    f"Escaneie a mesma pasta novamente para continuar de onde parou."
+                )
+            return
+
+        # Escaneamento concluído: o checkpoint não é mais necessário
+        checkpoint.remove()
+
         # Exibe resumo do escaneamento
         self.show_scan_summary(total_files, processed_files)
 
+        if library_builder is not None:
+            library_builder.finish()
+            messagebox.showinfo("Biblioteca de Referência",
+                                f"Biblioteca criada com {library_builder.count} imagens em:\n{self.library_dir}")
+            return
+        if self.scan_mode == "query_library":
+            self.show_library_report()
+            return
+
         # Ajuste o threshold conforme necessário
-        self.group_images(threshold=10)
+        if grouper is not None:
+            self.group_images_streaming(grouper)
+        else:
+            self.group_images(threshold=10)
+
+    def format_scan_stats(self):
+        """Monta as linhas de estatísticas de tempo do último escaneamento"""
+        hashed_count = self.scan_stats.get('hashed_images', 0) or 1
+        lines = [
+            f"⏱️ Tempo de hash: {self.scan_stats.get('hash_seconds', 0.0):.2f} s "
+            f"({self.scan_stats.get('hash_seconds', 0.0) / hashed_count * 1000:.1f} ms/imagem)"
+        ]
+        if self.scan_stats.get('detect_rotations'):
+            orientation_seconds = self.scan_stats.get('orientation_seconds', 0.0)
+            lines.append(
+                f"🔄 Custo extra das 8 orientações: {orientation_seconds:.2f} s "
+                f"({orientation_seconds / hashed_count * 1000:.2f} ms/imagem)"
+            )
+        if self.scan_stats.get('resumed_files'):
+            lines.append(f"♻️ Retomados do checkpoint: {self.scan_stats['resumed_files']} arquivo(s)")
+        if self.scan_stats.get('formats'):
+            lines.append("📦 Vazão de decodificação por formato:")
+        for fmt, (count, seconds, size) in sorted(self.scan_stats.get('formats', {}).items()):
+            seconds = seconds or 1e-9
+            lines.append(
+                f"   {fmt}: {count} arquivo(s), {count / seconds:.1f} img/s, "
+                f"{size / (1024 * 1024) / seconds:.1f} MB/s"
+            )
+        if self.scan_stats.get('animated_files'):
+            lines.append(
+                f"🎞️ Animações: {self.scan_stats['animated_files']} arquivo(s), "
+                f"{self.scan_stats['keyframes']} quadros-chave"
+            )
+        return "\n".join(lines)
 
     def show_scan_summary(self, total_files, processed_files):
         """Exibe resumo do escaneamento com detalhes de erros"""
         if not self.scan_errors:
             # Sem erros
             message = (
-                f"✓ {processed_files} de {total_files} imagens processadas com sucesso!\n\n"
+                f"✓ {processed_files} de {total_files} imagens processadas com sucesso!\n"
+                f"{self.format_scan_stats()}\n\n"
                 f"⚠️ Ao clicar em OK, o carregamento pode demorar alguns minutos.\n"
                 f"Por favor, aguarde."
             )
@@ -298,7 +1998,8 @@ class ImageCleaner:
         summary_text = (
             f"✓ Imagens processadas: {success_count}\n"
             f"✗ Imagens com erro: {error_count}\n"
-            f"📊 Total encontrado: {total_files}"
+            f"📊 Total encontrado: {total_files}\n"
+            f"{self.format_scan_stats()}"
         )
 
         tk.Label(summary_frame, text=summary_text, font=("Arial", 10, "bold"),
@@ -362,7 +2063,9 @@ class ImageCleaner:
         info_text = (
             "• Arquivo Truncado: Imagem incompleta, possivelmente download interrompido\n"
             "• Dados Corrompidos: Arquivo danificado, pode estar corrompido no disco\n"
-            "• Formato Inválido: Extensão .jpg mas não é uma imagem válida\n\n"
+            "• Formato Inválido: Extensão .jpg mas não é uma imagem válida\n"
+            "• Sem Decodificador: Formato reconhecido (ex.: HEIC), mas o plugin não está instalado\n"
+            "• Tempo Esgotado: O decodificador travou neste arquivo e foi interrompido\n\n"
             "💡 Recomendação: Você pode tentar recuperar essas imagens com ferramentas\n"
             "   especializadas ou movê-las para uma pasta separada para análise manual."
         )
@@ -376,112 +2079,146 @@ class ImageCleaner:
         # Aguarda o usuário fechar a janela antes de continuar
         error_window.wait_window()
 
-    def group_images(self, threshold=10):
-        """
-        Cria um grafo de similaridade usando o Union-Find.
-        Cada imagem é um nó e há uma aresta se diff <= threshold.
-        """
-        n = len(self.images_data)
-        if n == 0:
-            messagebox.showinfo("Resultado", "Nenhuma imagem encontrada.")
-            return
-
-        uf = UnionFind(n)
-
-        # Compara todos os pares de imagens (O(n^2))
-        for i in range(n):
-            for j in range(i+1, n):
-                diff = abs(self.images_data[i][1] - self.images_data[j][1])
-                if diff <= threshold:
-                    uf.union(i, j)
-
-        # Agrupa de acordo com o root
-        root_to_group = {}
-        for i in range(n):
-            root_i = uf.find(i)
-            if root_i not in root_to_group:
-                root_to_group[root_i] = []
-            root_to_group[root_i].append(self.images_data[i])
+    def show_library_report(self):
+        """Exibe quais imagens da pasta já existem na biblioteca de referência"""
+        found = [entry for entry in self.library_matches if entry[2]]
+        identical_count = sum(1 for _, md5_val, matches in found
+                              if any(match_md5 == md5_val for _, match_md5, _ in matches))
 
-        # Filtra grupos que tenham mais de 1 imagem
-        self.groups = [group for group in root_to_group.values() if len(group) > 1]
+        report_window = tk.Toplevel(self.master)
+        report_window.title("Comparação com a Biblioteca")
+        report_window.geometry("800x500")
 
-        if not self.groups:
-            messagebox.showinfo("Resultado", "Nenhuma imagem similar encontrada.")
-        else:
-            self.show_groups()
+        summary_text = (
+            f"📚 Biblioteca: {self.library_dir} ({len(self.reference_library)} imagens)\n"
+            f"✓ Já existem na biblioteca: {len(found)} de {len(self.library_matches)} "
+            f"({identical_count} idênticas)\n"
+            f"✗ Novas: {len(self.library_matches) - len(found)}"
+        )
+        tk.Label(report_window, text=summary_text, font=("Arial", 10, "bold"),
+                 justify="left").pack(anchor="w", padx=10, pady=10)
 
-    def create_groups_progress_window(self):
-        """Cria janela de progresso para inicialização de grupos"""
-        self.groups_progress_window = tk.Toplevel(self.master)
-        self.groups_progress_window.title("Preparando Grupos")
-        self.groups_progress_window.geometry("500x150")
-        self.groups_progress_window.resizable(False, False)
+        text_frame = tk.Frame(report_window)
+        text_frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
 
-        # Centraliza a janela
-        self.groups_progress_window.transient(self.master)
-        self.groups_progress_window.grab_set()
+        report_text = scrolledtext.ScrolledText(text_frame, wrap=tk.WORD, font=("Courier", 8))
+        report_text.pack(fill="both", expand=True)
 
-        # Frame principal
-        main_frame = tk.Frame(self.groups_progress_window, padx=20, pady=20)
-        main_frame.pack(fill="both", expand=True)
+        for filepath, md5_val, matches in found:
+            report_text.insert(tk.END, f"\n📁 {filepath}\n", "header")
+            for match_path, match_md5, distance in matches:
+                status = "Idêntica" if match_md5 == md5_val else f"Semelhante (distância {distance})"
+                report_text.insert(tk.END, f"   ↳ {match_path}  [{status}]\n")
 
-        # Label de status
-        self.groups_progress_label = tk.Label(main_frame, text="Inicializando grupos...", font=("Arial", 10))
-        self.groups_progress_label.pack(pady=(0, 10))
+        report_text.tag_config("header", font=("Courier", 8, "bold"))
+        report_text.config(state="disabled")
 
-        # Barra de progresso
-        self.groups_progress_bar = ttk.Progressbar(main_frame, length=450, mode='determinate')
-        self.groups_progress_bar.pack(pady=10)
+        bottom_frame = tk.Frame(report_window)
+        bottom_frame.pack(fill="x", padx=10, pady=10)
 
-        # Label de contagem
-        self.groups_progress_count_label = tk.Label(main_frame, text="0 / 0 grupos", font=("Arial", 9))
-        self.groups_progress_count_label.pack(pady=(5, 0))
+        tk.Button(bottom_frame, text="Salvar Relatório CSV", command=self.save_library_report,
+                  bg="#2196F3", fg="white", padx=10).pack(side="left", padx=5)
+        tk.Button(bottom_frame, text="Fechar", command=report_window.destroy,
+                  bg="#5cb85c", fg="white", padx=20).pack(side="right", padx=5)
 
-        # Força atualização
-        self.groups_progress_window.update()
+    def save_library_report(self):
+        """Salva o relatório de comparação com a biblioteca em CSV"""
+        report_path = filedialog.asksaveasfilename(title="Salvar relatório", defaultextension=".csv",
+                                                   filetypes=[("CSV", "*.csv")])
+        if not report_path:
+            return
+        try:
+            with open(report_path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(["arquivo", "md5", "correspondencia", "md5_correspondencia", "distancia", "identica"])
+                for filepath, md5_val, matches in self.library_matches:
+                    if not matches:
+                        writer.writerow([filepath, md5_val, "", "", "", ""])
+                    for match_path, match_md5, distance in matches:
+                        writer.writerow([filepath, md5_val, match_path, match_md5, distance,
+                                         "sim" if match_md5 == md5_val else "não"])
+            messagebox.showinfo("Relatório", f"Relatório salvo em:\n{report_path}")
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao salvar relatório: {e}")
 
-    def update_groups_progress(self, current, total):
-        """Atualiza a barra de progresso de grupos"""
-        if hasattr(self, 'groups_progress_window') and self.groups_progress_window.winfo_exists():
-            # Atualiza o progresso
-            progress_percent = (current / total * 100) if total > 0 else 0
-            self.groups_progress_bar['value'] = progress_percent
+    def group_images(self, threshold=10):
+        """Agrupa as imagens escaneadas (find_similar_groups) e exibe os grupos."""
+        n = len(self.images_data)
+        if n == 0:
+            messagebox.showinfo("Resultado", "Nenhuma imagem encontrada.")
+            return
 
-            # Atualiza labels
-            self.groups_progress_label.config(text=f"Preparando grupo {current} de {total}...")
-            self.groups_progress_count_label.config(text=f"{current} / {total} grupos")
+        self.set_groups(find_similar_groups(self.images_data, threshold, self.dihedral_hashes,
+                                            self.frame_signatures))
 
-            # Força atualização da interface
-            self.groups_progress_window.update()
+        if not self.groups:
+            messagebox.showinfo("Resultado", "Nenhuma imagem similar encontrada.")
+        else:
+            self.show_groups()
 
-    def initialize_all_groups(self):
-        """Inicializa estrutura de dados para todos os grupos antes de renderizar"""
-        total_groups = len(self.groups)
+    def group_images_streaming(self, grouper):
+        """
+        Agrupa usando o StreamingGrouper (modo de baixa memória).
+        Os grupos vão direto para um GroupStore em disco; a interface lê só as páginas exibidas.
+        """
+        if grouper.count == 0:
+            grouper.close()
+            messagebox.showinfo("Resultado", "Nenhuma imagem encontrada.")
+            return
 
-        for idx, group in enumerate(self.groups):
-            # Atualiza progresso
-            self.update_groups_progress(idx + 1, total_groups)
+        store = GroupStore()
+        try:
+            for group in grouper.iter_groups():
+                store.append(group)
+        except Exception:
+            store.close()
+            raise
+        finally:
+            grouper.close()
+        self.set_groups(store)
 
-            check_vars = []
-            image_info_list = []
+        if not self.groups:
+            messagebox.showinfo("Resultado", "Nenhuma imagem similar encontrada.")
+        else:
+            self.show_groups()
 
-            # Conta MD5 duplicados
-            md5_count = {}
-            for (_, _, md5_val) in group:
-                md5_count[md5_val] = md5_count.get(md5_val, 0) + 1
+    def describe_group(self, idx):
+        """Lê um grupo e monta os dados das suas imagens (sem variáveis Tk)"""
+        group = self.groups[idx]
+        if isinstance(self.groups, GroupStore):
+            qualities = self.groups.qualities(idx)
+        else:
+            qualities = [self.image_quality.get(filepath) for filepath, _, _ in group]
+
+        # Conta MD5 duplicados
+        md5_count = {}
+        for (_, _, md5_val) in group:
+            md5_count[md5_val] = md5_count.get(md5_val, 0) + 1
+
+        image_info_list = []
+        for position, ((filepath, p_hash, md5_val), quality) in enumerate(zip(group, qualities)):
+            image_info_list.append({
+                'filepath': filepath,
+                'md5': md5_val,
+                'position': position,
+                'mtime': os.path.getmtime(filepath),
+                'quality': quality
+            })
+        return group, image_info_list, md5_count
+
+    def get_group_data(self, idx):
+        """
+        Dados de um grupo com os IntVar de seleção, criados na primeira vez que o grupo é exibido
+        ou selecionado; assim a memória cresce com os grupos usados, não com os encontrados.
+        """
+        if idx not in self.group_check_vars:
+            group, image_info_list, md5_count = self.describe_group(idx)
 
             # Cria IntVar para cada imagem
-            for filepath, p_hash, md5_val in group:
-                var = tk.IntVar()
-                check_vars.append(var)
-
-                image_info_list.append({
-                    'filepath': filepath,
-                    'md5': md5_val,
-                    'var': var,
-                    'mtime': os.path.getmtime(filepath)
-                })
+            check_vars = []
+            for img_info in image_info_list:
+                img_info['var'] = tk.IntVar()
+                check_vars.append(img_info['var'])
 
             # Armazena dados do grupo
             self.group_check_vars[idx] = {
@@ -490,22 +2227,35 @@ class ImageCleaner:
                 'md5_count': md5_count,
                 'group': group
             }
+        return self.group_check_vars[idx]
+
+    def iter_groups_images(self):
+        """Percorre todos os grupos como (índice, imagens, md5_count), sem criar IntVar para os não usados"""
+        for group_idx in range(len(self.groups)):
+            group_data = self.group_check_vars.get(group_idx)
+            if group_data is not None:
+                yield group_idx, group_data['images'], group_data['md5_count']
+            else:
+                _, image_info_list, md5_count = self.describe_group(group_idx)
+                yield group_idx, image_info_list, md5_count
+
+    def select_in_group(self, group_idx, positions):
+        """Marca as imagens das posições indicadas de um grupo"""
+        images = self.get_group_data(group_idx)['images']
+        for position in positions:
+            images[position]['var'].set(1)
+
+    def set_groups(self, groups):
+        """Troca os grupos exibidos, removendo os arquivos dos anteriores se estavam em disco"""
+        if isinstance(self.groups, GroupStore):
+            self.groups.close()
+        self.groups = groups
 
     def show_groups(self):
         """Exibe a janela listando os grupos de imagens com opções de mover ou excluir,
            dentro de um canvas com scrollbar e paginação."""
         self.current_page = 0
-        self.group_check_vars = {}  # Reseta a estrutura
-
-        # Cria janela de progresso
-        self.create_groups_progress_window()
-
-        # Inicializa estrutura de dados para TODOS os grupos
-        self.initialize_all_groups()
-
-        # Fecha janela de progresso
-        if hasattr(self, 'groups_progress_window') and self.groups_progress_window.winfo_exists():
-            self.groups_progress_window.destroy()
+        self.group_check_vars = {}  # Reseta a estrutura (preenchida sob demanda por get_group_data)
 
         self.groups_window = tk.Toplevel(self.master)
         self.groups_window.title("Grupos de Imagens Similares")
@@ -530,6 +2280,13 @@ class ImageCleaner:
                                        bg="#FF9800", fg="white")
         btn_select_similar.pack(side="left", padx=5)
 
+        # Critério da imagem mantida pelas seleções automáticas
+        tk.Label(top_frame, text="Manter:").pack(side="left", padx=(5, 0))
+        self.keeper_policy_var = tk.StringVar(value=self.keeper_policy)
+        keeper_combo = ttk.Combobox(top_frame, textvariable=self.keeper_policy_var,
+                                    values=list(KEEPER_POLICIES), state="readonly", width=16)
+        keeper_combo.pack(side="left", padx=5)
+
         # Botões de ação global
         btn_move_all = tk.Button(top_frame, text="Mover Todas Selecionadas",
                                 command=self.move_all_selected,
@@ -541,6 +2298,11 @@ class ImageCleaner:
                                    bg="#f44336", fg="white")
         btn_delete_all.pack(side="left", padx=5)
 
+        btn_link_all = tk.Button(top_frame, text="Substituir Idênticas por Link",
+                                 command=self.link_all_selected,
+                                 bg="#9C27B0", fg="white")
+        btn_link_all.pack(side="left", padx=5)
+
         # Botões de navegação
         nav_frame = tk.Frame(top_frame)
         nav_frame.pack(side="right")
@@ -610,7 +2372,7 @@ class ImageCleaner:
 
         # Renderiza grupos da página atual
         for idx in range(start_idx, end_idx):
-            group_data = self.group_check_vars[idx]
+            group_data = self.get_group_data(idx)
             group = group_data['group']
             md5_count = group_data['md5_count']
             images = group_data['images']
@@ -671,6 +2433,14 @@ class ImageCleaner:
                     f"Modificado em: {mtime_str}\n"
                 )
 
+                quality = img_info['quality']
+                if quality:
+                    info_text += (
+                        f"Resolução: {quality['width']}x{quality['height']} | "
+                        f"Nitidez: {quality['sharpness']:.0f} | "
+                        f"EXIF: {'Sim' if quality['has_exif'] else 'Não'}\n"
+                    )
+
                 lbl_info = tk.Label(text_frame, text=info_text, justify="left", anchor="w")
                 lbl_info.pack(anchor="w")
 
@@ -704,14 +2474,13 @@ class ImageCleaner:
 
     def select_identical_images(self):
         """Seleciona automaticamente imagens idênticas (mesmo MD5),
-           deixando apenas a mais antiga de cada grupo não selecionada."""
+           deixando apenas a melhor de cada grupo (pelo critério escolhido) não selecionada."""
         selected_count = 0
+        policy = self.keeper_policy_var.get()
+        keeper_key = KEEPER_POLICIES[policy]
 
-        # Itera sobre todos os grupos da página atual
-        for group_idx, group_data in self.group_check_vars.items():
-            images = group_data['images']
-            md5_count = group_data['md5_count']
-
+        # Itera sobre todos os grupos
+        for group_idx, images, md5_count in self.iter_groups_images():
             # Agrupa imagens por MD5
             md5_groups = {}
             for img_info in images:
@@ -721,44 +2490,45 @@ class ImageCleaner:
                 md5_groups[md5].append(img_info)
 
             # Para cada MD5 que aparece mais de uma vez (idênticas)
+            to_select = []
             for md5, identical_images in md5_groups.items():
                 if len(identical_images) > 1:
-                    # Ordena por data de modificação (mais antiga primeiro)
-                    identical_images.sort(key=lambda x: x['mtime'])
+                    # Ordena pelo critério (melhor primeiro)
+                    identical_images.sort(key=keeper_key)
+
+                    # Seleciona todas exceto a primeira (melhor)
+                    to_select.extend(img_info['position'] for img_info in identical_images[1:])
 
-                    # Seleciona todas exceto a primeira (mais antiga)
-                    for img_info in identical_images[1:]:
-                        img_info['var'].set(1)
-                        selected_count += 1
+            if to_select:
+                self.select_in_group(group_idx, to_select)
+                selected_count += len(to_select)
 
         messagebox.showinfo("Seleção Concluída",
-                           f"{selected_count} imagens idênticas foram selecionadas (mantendo a mais antiga de cada grupo).")
+                           f"{selected_count} imagens idênticas foram selecionadas (mantendo de cada grupo: {policy.lower()}).")
 
     def select_similar_images(self):
         """Seleciona automaticamente imagens semelhantes (MD5 diferente),
-           deixando apenas a mais antiga de cada grupo não selecionada."""
+           deixando apenas a melhor de cada grupo (pelo critério escolhido) não selecionada."""
         selected_count = 0
+        policy = self.keeper_policy_var.get()
+        keeper_key = KEEPER_POLICIES[policy]
 
         # Itera sobre todos os grupos
-        for group_idx, group_data in self.group_check_vars.items():
-            images = group_data['images']
-            md5_count = group_data['md5_count']
-
+        for group_idx, images, md5_count in self.iter_groups_images():
             # Filtra apenas imagens semelhantes (MD5 único, ou seja, não duplicado)
             similar_images = [img_info for img_info in images if md5_count[img_info['md5']] == 1]
 
             # Se há pelo menos 2 imagens semelhantes no grupo
             if len(similar_images) > 1:
-                # Ordena por data de modificação (mais antiga primeiro)
-                similar_images.sort(key=lambda x: x['mtime'])
+                # Ordena pelo critério (melhor primeiro)
+                similar_images.sort(key=keeper_key)
 
-                # Seleciona todas exceto a primeira (mais antiga)
-                for img_info in similar_images[1:]:
-                    img_info['var'].set(1)
-                    selected_count += 1
+                # Seleciona todas exceto a primeira (melhor)
+                self.select_in_group(group_idx, [img_info['position'] for img_info in similar_images[1:]])
+                selected_count += len(similar_images) - 1
 
         messagebox.showinfo("Seleção Concluída",
-                           f"{selected_count} imagens semelhantes foram selecionadas (mantendo a mais antiga de cada grupo).")
+                           f"{selected_count} imagens semelhantes foram selecionadas (mantendo de cada grupo: {policy.lower()}).")
 
     def move_all_selected(self):
         """Move todas as imagens selecionadas de todos os grupos"""
@@ -851,6 +2621,68 @@ class ImageCleaner:
         else:
             messagebox.showinfo("Excluir", f"{deleted_count} imagens excluídas com sucesso!")
 
+    def link_all_selected(self):
+        """Substitui cada cópia idêntica selecionada por um link (reflink ou hardlink)
+           para a mais antiga do seu conjunto, mantendo todos os caminhos válidos."""
+        # Monta pares (mantida, cópia) apenas para imagens idênticas selecionadas
+        link_pairs = []
+        for group_idx, group_data in self.group_check_vars.items():
+            md5_groups = {}
+            for img_info in group_data['images']:
+                if group_data['md5_count'][img_info['md5']] > 1:
+                    md5_groups.setdefault(img_info['md5'], []).append(img_info)
+
+            for md5, identical_images in md5_groups.items():
+                # Mantém a mais antiga entre as não selecionadas (ou a mais antiga de todas)
+                identical_images = sorted(identical_images, key=lambda x: x['mtime'])
+                unselected = [img_info for img_info in identical_images if img_info['var'].get() == 0]
+                keeper = unselected[0] if unselected else identical_images[0]
+
+                for img_info in identical_images:
+                    if img_info is not keeper and img_info['var'].get() == 1:
+                        link_pairs.append((keeper, img_info))
+
+        if not link_pairs:
+            messagebox.showinfo("Substituir por Link", "Nenhuma imagem idêntica selecionada.")
+            return
+
+        confirm = messagebox.askyesno("Substituir por Link",
+                                      f"Substituir {len(link_pairs)} cópias idênticas por links para o arquivo mantido?")
+        if not confirm:
+            return
+
+        linked_count = {"reflink": 0, "hardlink": 0}
+        reclaimed_bytes = 0
+        errors = []
+
+        for keeper, img_info in link_pairs:
+            filepath = img_info['filepath']
+            try:
+                method, reclaimed = replace_with_link(keeper['filepath'], filepath)
+                linked_count[method] += 1
+                reclaimed_bytes += reclaimed
+                img_info['var'].set(0)  # Desmarca após substituir
+            except Exception as e:
+                errors.append(f"{filepath}: {str(e)}")
+
+        # Recarrega a página atual para atualizar a visualização
+        self.render_page()
+
+        total_linked = linked_count["reflink"] + linked_count["hardlink"]
+        summary = (
+            f"{total_linked} cópias substituídas por link "
+            f"({linked_count['reflink']} reflinks, {linked_count['hardlink']} hardlinks).\n"
+            f"Espaço recuperado: {reclaimed_bytes / (1024 * 1024):.2f} MB ({reclaimed_bytes} bytes)"
+        )
+
+        if errors:
+            error_msg = summary + "\n\nErros:\n" + "\n".join(errors[:5])
+            if len(errors) > 5:
+                error_msg += f"\n... e mais {len(errors) - 5} erros."
+            messagebox.showwarning("Substituir por Link - Concluído com Erros", error_msg)
+        else:
+            messagebox.showinfo("Substituir por Link", summary)
+
     def move_images(self, group, check_vars):
         dest_folder = filedialog.askdirectory(title="Selecione a pasta de destino")
         if not dest_folder:
@@ -877,7 +2709,433 @@ class ImageCleaner:
                     print(f"Erro ao excluir {filepath}: {e}")
         messagebox.showinfo("Excluir", "Operação de exclusão concluída!")
 
-if __name__ == "__main__":
+def hash_file(filepath, detect_rotations=False):
+    """Hashes de uma imagem mais o MD5 do arquivo (executado no pool de processos do serviço)."""
+    result = compute_image_hashes(filepath, detect_rotations)
+    result['md5'] = get_file_md5(filepath)
+    return result
+
+DEFAULT_SERVICE_PORT = 8765
+
+# Cabeçalho de imports da versão antiga (tudo carregado no import), usado como referência no benchmark
+EAGER_IMPORTS = ("import hashlib; import tkinter as tk; "
+                 "from tkinter import filedialog, messagebox, scrolledtext, ttk; "
+                 "from PIL import Image, ImageTk, ImageFile; import imagehash")
+
+def time_python_snippet(code, runs):
+    """Executa `code` em um interpretador novo `runs` vezes e devolve os tempos (ms) de cada execução."""
+    import subprocess
+    import sys
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=script_dir, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def measure_first_paint(runs, mode="lazy"):
+    """
+    Tempos (ms) do início do import até a primeira pintura da janela. Com mode="eager", as
+    bibliotecas pesadas são importadas antes de criar a janela, como no cabeçalho antigo.
+    Execuções que falham são descartadas; None se nenhuma funcionou (ex.: sem display).
+    """
+    import subprocess
+    import sys
+    timings = []
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--first-paint-probe", mode],
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            continue
+        timings.append(float(proc.stdout.strip().splitlines()[-1]))
+    return timings or None
+
+def benchmark_startup(runs=5):
+    """
+    Compara o custo de inicialização em processos novos (cache de disco quente, mediana de `runs`):
+    interpretador vazio, import deste módulo, o cabeçalho de imports da versão antiga e primeira
+    pintura da janela com imports lazy e eager.
+    """
+    baseline = time_python_snippet("pass", runs)
+    return {
+        "interpretador": baseline,
+        "import main (lazy)": time_python_snippet("import main", runs),
+        "cabeçalho antigo (eager)": time_python_snippet(EAGER_IMPORTS, runs),
+        "primeira pintura (lazy)": measure_first_paint(runs, "lazy"),
+        "primeira pintura (eager)": measure_first_paint(runs, "eager"),
+    }
+
+def median_ms(timings):
+    return sorted(timings)[len(timings) // 2]
+
+def format_startup_benchmark(results):
+    lines = ["Benchmark de inicialização (mediana, ms):"]
+    baseline = median_ms(results["interpretador"])
+    for label, timings in results.items():
+        if timings is None:
+            lines.append(f"  {label:<26} indisponível (sem display gráfico)")
+            continue
+        median = median_ms(timings)
+        extra = "" if label == "interpretador" or label.startswith("primeira pintura") \
+            else f"  (+{median - baseline:.1f} sobre o interpretador)"
+        lines.append(f"  {label:<26} {median:8.1f}{extra}")
+
+    lazy, eager = results["primeira pintura (lazy)"], results["primeira pintura (eager)"]
+    if lazy and eager:
+        lines.append(f"  Primeira pintura {median_ms(eager) - median_ms(lazy):.1f} ms mais cedo com imports lazy")
+    return "\n".join(lines)
+
+class DedupService:
+    """
+    Serviço local de deduplicação (asyncio), para outras ferramentas perguntarem
+    "esta imagem é duplicada?" sem cada uma fazer seu próprio escaneamento.
+    Mantém o índice de Hamming e os grupos do Union-Find em memória e atende requisições
+    em JSON, uma por linha, em localhost (TCP) ou em um socket Unix.
+    As decodificações entram em uma fila atendida por workers processos (um DecodeWorker cada);
+    um processo que excede decode_timeout é encerrado e recriado, como no escaneamento da interface.
+
+    Operações: hash, lookup, add (todas com "paths"; lookup também aceita "hashes" em hex),
+    groups, stats e shutdown.
+    """
+    def __init__(self, threshold=10, workers=None, detect_rotations=False, decode_timeout=30,
+                 queue_size=1024):
+        self.threshold = threshold
+        self.workers = workers or os.cpu_count() or 1
+        self.detect_rotations = detect_rotations
+        self.decode_timeout = decode_timeout
+        self.queue_size = queue_size
+        self.index = HammingIndex(threshold)
+        self.uf = UnionFind(0)
+        self.entries = []  # (caminho, md5, hash) por id
+        self.path_ids = {}
+        self.decoders = []
+        self.queue = None
+        self.stop_event = None
+        self.connections = {}  # tarefa -> writer de cada cliente conectado
+        self.started = time.monotonic()
+        self.files_decoded = 0
+        self.decode_errors = 0
+        self.decode_seconds = 0.0
+        self.requests = collections.Counter()
+        self.latencies = collections.defaultdict(lambda: collections.deque(maxlen=1000))
+
+    async def _run_in_decoder(self, decoder, filepath):
+        """Decodifica no processo do DecodeWorker; se exceder o tempo limite, o processo é encerrado"""
+        loop = asyncio.get_running_loop()
+        outcome = loop.create_future()
+
+        def deliver(setter, value):
+            if not outcome.done():
+                setter(value)
+
+        decoder.submit(hash_file, (filepath, self.detect_rotations),
+                       callback=lambda r: loop.call_soon_threadsafe(deliver, outcome.set_result, r),
+                       error_callback=lambda e: loop.call_soon_threadsafe(deliver, outcome.set_exception, e))
+        try:
+            return await asyncio.wait_for(outcome, self.decode_timeout)
+        except asyncio.TimeoutError:
+            # Libera o slot: o processo travado é morto e o próximo arquivo recria um novo
+            await loop.run_in_executor(None, decoder.kill)
+            raise ImageScanError("Tempo Esgotado",
+                                 f"Decodificação excedeu {self.decode_timeout} s (decodificador travado ou arquivo patológico)")
+
+    async def _decode_worker(self, decoder):
+        """Consome a fila de decodificação, uma imagem por vez, no processo do decoder"""
+        while True:
+            filepath, future = await self.queue.get()
+            start = time.perf_counter()
+            try:
+                result = await self._run_in_decoder(decoder, filepath)
+                self.files_decoded += 1
+                if not future.done():
+                    future.set_result(result)
+            except asyncio.CancelledError:
+                self._fail_request(future)
+                raise
+            except Exception as e:
+                self.decode_errors += 1
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self.decode_seconds += time.perf_counter() - start
+                self.queue.task_done()
+
+    def _fail_request(self, future):
+        """Encerra com erro uma decodificação que não será mais feita (serviço em shutdown)"""
+        if not future.done():
+            future.set_exception(ImageScanError("Serviço Encerrado",
+                                                "O serviço foi encerrado antes da decodificação"))
+
+    async def decode(self, paths):
+        """Enfileira as imagens e aguarda todas; retorna um dict por caminho (resultado ou erro)"""
+        loop = asyncio.get_running_loop()
+        pending = []
+        for filepath in paths:
+            future = loop.create_future()
+            if self.stop_event.is_set():
+                self._fail_request(future)
+            else:
+                await self.queue.put((filepath, future))
+            pending.append(future)
+
+        results = []
+        for filepath, outcome in zip(paths, await asyncio.gather(*pending, return_exceptions=True)):
+            if isinstance(outcome, BaseException):
+                error_type, error_msg = categorize_scan_error(outcome)
+                results.append({'path': filepath, 'error': {'type': error_type, 'message': error_msg}})
+            else:
+                results.append(dict(outcome, path=filepath))
+        return results
+
+    def lookup(self, hashes, exclude=None):
+        """Imagens do índice a até threshold bits de qualquer um dos hashes"""
+        return [
+            {'path': self.entries[key][0], 'md5': self.entries[key][1],
+             'distance': distance, 'group': self.uf.find(key)}
+            for key, distance in self.index.query(hashes) if key != exclude
+        ]
+
+    def add(self, result):
+        """Adiciona uma imagem decodificada ao índice e une ao grupo das semelhantes"""
+        hashes = result['variants'] or [result['hash']]
+        filepath = result['path']
+        if filepath in self.path_ids:
+            key = self.path_ids[filepath]
+        else:
+            key = self.uf.add()
+            self.entries.append((filepath, result['md5'], result['hash']))
+            self.path_ids[filepath] = key
+            for match_key, _ in self.index.query(hashes[0]):
+                self.uf.union(key, match_key)
+            self.index.add(key, hashes)
+        return key
+
+    def public_result(self, result):
+        """Resultado de decodificação no formato da resposta"""
+        if 'error' in result:
+            return result
+        return {
+            'path': result['path'],
+            'hash': f"{result['hash']:016x}",
+            'md5': result['md5'],
+            'format': result['format'],
+            'quality': result['quality'],
+        }
+
+    def groups(self):
+        """Grupos atuais com mais de uma imagem"""
+        root_to_group = {}
+        for key, (filepath, _, _) in enumerate(self.entries):
+            root_to_group.setdefault(self.uf.find(key), []).append(filepath)
+        return [group for group in root_to_group.values() if len(group) > 1]
+
+    def stats(self):
+        """Métricas de vazão e latência"""
+        uptime = time.monotonic() - self.started
+        latency = {}
+        for op, samples in self.latencies.items():
+            ordered = sorted(samples)
+            percentile = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+            latency[op] = {
+                'p50_ms': round(percentile(0.50), 3),
+                'p95_ms': round(percentile(0.95), 3),
+                'p99_ms': round(percentile(0.99), 3),
+                'max_ms': round(ordered[-1] * 1000, 3),
+            }
+        return {
+            'uptime_s': round(uptime, 3),
+            'indexed_images': len(self.entries),
+            'groups': len(self.groups()),
+            'queue_depth': self.queue.qsize() if self.queue else 0,
+            'workers': self.workers,
+            'files_decoded': self.files_decoded,
+            'decode_errors': self.decode_errors,
+            'files_per_second': round(self.files_decoded / uptime, 3) if uptime else 0.0,
+            'decode_seconds': round(self.decode_seconds, 3),
+            'requests': dict(self.requests),
+            'latency': latency,
+        }
+
+    async def dispatch(self, request):
+        """Executa uma requisição e retorna a resposta"""
+        op = request.get('op')
+        paths = request.get('paths', [])
+
+        if op == 'hash':
+            return {'ok': True, 'results': [self.public_result(r) for r in await self.decode(paths)]}
+
+        if op == 'lookup':
+            results = []
+            for hex_hash in request.get('hashes', []):
+                results.append({'hash': hex_hash, 'matches': self.lookup([int(hex_hash, 16)])})
+            for result in await self.decode(paths):
+                if 'error' in result:
+                    results.append(result)
+                    continue
+                matches = self.lookup(result['variants'] or [result['hash']],
+                                      exclude=self.path_ids.get(result['path']))
+                results.append(dict(self.public_result(result), matches=matches,
+                                    duplicate=any(m['md5'] == result['md5'] for m in matches)))
+            return {'ok': True, 'results': results}
+
+        if op == 'add':
+            results = []
+            for result in await self.decode(paths):
+                if 'error' in result:
+                    results.append(result)
+                    continue
+                key = self.add(result)
+                matches = self.lookup(result['variants'] or [result['hash']], exclude=key)
+                results.append(dict(self.public_result(result), group=self.uf.find(key), matches=matches))
+            return {'ok': True, 'results': results}
+
+        if op == 'groups':
+            return {'ok': True, 'groups': self.groups()}
+
+        if op == 'stats':
+            return {'ok': True, 'stats': self.stats()}
+
+        if op == 'shutdown':
+            self.stop_event.set()
+            return {'ok': True}
+
+        return {'ok': False, 'error': f"Operação desconhecida: {op}"}
+
+    async def handle_client(self, reader, writer):
+        """Atende uma conexão: uma requisição JSON por linha, uma resposta por linha"""
+        self.connections[asyncio.current_task()] = writer
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                start = time.perf_counter()
+                request = {}
+                try:
+                    request = json.loads(line)
+                    response = await self.dispatch(request)
+                except Exception as e:
+                    response = {'ok': False, 'error': str(e)}
+                op = request.get('op', '?') if isinstance(request, dict) else '?'
+                if isinstance(request, dict) and 'id' in request:
+                    response['id'] = request['id']
+                self.requests[op] += 1
+                self.latencies[op].append(time.perf_counter() - start)
+                writer.write((json.dumps(response) + "\n").encode("utf-8"))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections.pop(asyncio.current_task(), None)
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=DEFAULT_SERVICE_PORT, socket_path=None):
+        """Inicia o serviço e aguarda até receber shutdown"""
+        self.decoders = [DecodeWorker(self.decode_timeout) for _ in range(self.workers)]
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.stop_event = asyncio.Event()
+        consumers = [asyncio.create_task(self._decode_worker(decoder)) for decoder in self.decoders]
+
+        if socket_path:
+            server = await asyncio.start_unix_server(self.handle_client, path=socket_path)
+            print(f"Serviço de deduplicação ouvindo em {socket_path}", flush=True)
+        else:
+            server = await asyncio.start_server(self.handle_client, host, port)
+            print(f"Serviço de deduplicação ouvindo em {host}:{port}", flush=True)
+
+        try:
+            await self.stop_event.wait()
+        finally:
+            self.stop_event.set()
+            server.close()
+            # Decodificações em andamento ou na fila terminam com erro, liberando as requisições que as aguardam
+            for consumer in consumers:
+                consumer.cancel()
+            await asyncio.gather(*consumers, return_exceptions=True)
+            while not self.queue.empty():
+                _, future = self.queue.get_nowait()
+                self._fail_request(future)
+                self.queue.task_done()
+            # Encerra os processos sem esperar: um decodificador travado não pode bloquear o shutdown
+            for decoder in self.decoders:
+                decoder.kill()
+            # Fecha as conexões abertas: cada cliente recebe EOF e sua tarefa termina normalmente
+            for writer in list(self.connections.values()):
+                writer.close()
+            await asyncio.gather(*self.connections, return_exceptions=True)
+            await server.wait_closed()
+            if socket_path and os.path.exists(socket_path):
+                os.remove(socket_path)
+
+class DedupClient:
+    """Cliente síncrono mínimo do DedupService (para outras ferramentas e testes)."""
+    def __init__(self, host="127.0.0.1", port=DEFAULT_SERVICE_PORT, socket_path=None, timeout=60):
+        if socket_path:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            self.sock.connect(socket_path)
+        else:
+            self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.stream = self.sock.makefile("rwb")
+
+    def request(self, op, **params):
+        """Envia uma requisição e retorna a resposta (dict)"""
+        self.stream.write((json.dumps(dict(params, op=op)) + "\n").encode("utf-8"))
+        self.stream.flush()
+        line = self.stream.readline()
+        if not line:
+            raise ConnectionError("Serviço encerrou a conexão")
+        return json.loads(line)
+
+    def close(self):
+        self.stream.close()
+        self.sock.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Image Cleaner")
+    parser.add_argument("--serve", action="store_true",
+                        help="inicia o serviço local de deduplicação (sem interface gráfica)")
+    parser.add_argument("--host", default="127.0.0.1", help="endereço do serviço (padrão: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_SERVICE_PORT, help="porta TCP do serviço")
+    parser.add_argument("--socket", help="usa um socket Unix neste caminho em vez de TCP")
+    parser.add_argument("--workers", type=int, default=None, help="processos de decodificação (padrão: nº de CPUs)")
+    parser.add_argument("--threshold", type=int, default=10, help="distância máxima entre hashes semelhantes")
+    parser.add_argument("--rotations", action="store_true", help="detecta rotações/espelhamentos")
+    parser.add_argument("--benchmark-startup", action="store_true",
+                        help="mede o tempo de import e de primeira pintura da janela e sai")
+    parser.add_argument("--runs", type=int, default=5, help="repetições do benchmark de inicialização")
+    parser.add_argument("--first-paint-probe", choices=["lazy", "eager"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.benchmark_startup:
+        print(format_startup_benchmark(benchmark_startup(runs=args.runs)))
+        return
+
+    if args.serve:
+        service = DedupService(threshold=args.threshold, workers=args.workers,
+                               detect_rotations=args.rotations)
+        asyncio.run(service.serve(host=args.host, port=args.port, socket_path=args.socket))
+        return
+
+    if args.first_paint_probe == "eager":
+        # Referência do benchmark: carrega tudo antes da janela, como o cabeçalho antigo
+        exec(EAGER_IMPORTS, {})
+
     root = tk.Tk()
     app = ImageCleaner(root)
+
+    if args.first_paint_probe:
+        # Usado pelo benchmark: pinta a janela uma vez, informa o tempo desde o início do import e sai
+        root.update()
+        print(f"{(time.perf_counter() - MODULE_LOAD_START) * 1000:.1f}")
+        root.destroy()
+        return
+
+    # Carrega PIL/NumPy/SciPy em segundo plano enquanto o usuário escolhe a pasta
+    root.after_idle(lambda: threading.Thread(target=preload_heavy_modules, daemon=True).start())
     root.mainloop()
+
+if __name__ == "__main__":
+    main()
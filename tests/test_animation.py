@@ -0,0 +1,76 @@
+import imagehash
+import numpy as np
+from PIL import Image
+
+import main
+
+
+def save_animation(path, total_frames, step):
+    """Animação de um gradiente que muda ao longo do tempo; step > 1 simula uma versão com menos quadros."""
+    y, x = np.mgrid[0:48, 0:48]
+    frames = [Image.fromarray(((x * (1 + i / 60) + y * (3 - i / 100)) * 4 % 256).astype(np.uint8)).convert("P")
+              for i in range(0, total_frames, step)]
+    frames[0].save(path, save_all=True, append_images=frames[1:], duration=40 * step)
+
+
+def test_signature_covers_long_animation(tmp_path):
+    save_animation(tmp_path / "full.gif", 300, 1)
+    save_animation(tmp_path / "half.gif", 300, 2)
+    full = main.frame_signature(Image.open(tmp_path / "full.gif"))
+    half = main.frame_signature(Image.open(tmp_path / "half.gif"))
+
+    assert len(full) <= main.MAX_KEYFRAMES
+    assert len(half) <= main.MAX_KEYFRAMES
+    # Os quadros-chave alinhados cobrem o mesmo trecho das duas versões
+    assert main.signature_distance(full, half) <= 2
+
+
+def test_short_animation_keeps_default_stride(tmp_path):
+    save_animation(tmp_path / "short.gif", 20, 1)
+    assert len(main.frame_signature(Image.open(tmp_path / "short.gif"))) == 5
+
+
+def save_with_intro(path, pattern, total_frames=40):
+    """Animação que abre com um quadro preto seguido de um padrão próprio."""
+    y, x = np.mgrid[0:48, 0:48]
+    frames = [Image.new("L", (48, 48), 0).convert("P")]
+    for i in range(total_frames - 1):
+        if pattern == "diagonal":
+            pixels = (x + y + i) * 5 % 256
+        else:
+            pixels = (np.sin(x / (3 + i / 20)) * np.cos(y / 4) * 127 + 128)
+        frames.append(Image.fromarray(pixels.astype(np.uint8)).convert("P"))
+    frames[0].save(path, save_all=True, append_images=frames[1:], duration=40)
+
+
+def animation_entries(paths):
+    signatures = {str(path): main.frame_signature(Image.open(path)) for path in paths}
+    images_data = [(path, imagehash.hex_to_hash(f"{signature[0]:016x}"), f"md5-{i}")
+                   for i, (path, signature) in enumerate(signatures.items())]
+    return images_data, signatures
+
+
+def test_shared_intro_frame_does_not_group_animations(tmp_path):
+    save_with_intro(tmp_path / "a.gif", "diagonal")
+    save_with_intro(tmp_path / "b.gif", "waves")
+    images_data, signatures = animation_entries([tmp_path / "a.gif", tmp_path / "b.gif"])
+
+    sig_a, sig_b = signatures.values()
+    assert (sig_a[0] ^ sig_b[0]).bit_count() == 0
+    assert main.signature_distance(sig_a, sig_b) > 10
+    assert main.find_similar_groups(images_data, 10, frame_signatures=signatures) == []
+    # Também no modo de rotação, em que o pHash das 8 orientações vem do primeiro quadro
+    dihedral = {path: [signatures[path][0]] * 8 for path, _, _ in images_data}
+    assert main.find_similar_groups(images_data, 10, dihedral, signatures) == []
+
+
+def test_matching_animations_are_grouped(tmp_path):
+    save_animation(tmp_path / "full.gif", 300, 1)
+    save_animation(tmp_path / "half.gif", 300, 2)
+    save_with_intro(tmp_path / "other.gif", "waves")
+    images_data, signatures = animation_entries([tmp_path / "full.gif", tmp_path / "half.gif",
+                                                 tmp_path / "other.gif"])
+
+    groups = main.find_similar_groups(images_data, 10, frame_signatures=signatures)
+    assert [[path for path, _, _ in group] for group in groups] == [
+        [str(tmp_path / "full.gif"), str(tmp_path / "half.gif")]]
@@ -0,0 +1,62 @@
+import pytest
+
+import main
+
+
+@pytest.fixture(autouse=True)
+def checkpoint_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "CHECKPOINT_DIR", str(tmp_path / "checkpoints"))
+
+
+def record(i):
+    return {'path': f"/fotos/p{i}.jpg", 'size': 1000 + i, 'mtime': 1700000000.5 + i, 'md5': f"{i:032x}",
+            'result': {'hash': i, 'variants': list(range(8)), 'signature': None, 'quality': {'sharpness': 1.5}}}
+
+
+def write_checkpoint(folder, records, resume=False):
+    checkpoint = main.ScanCheckpoint(folder, {'subfolders': True}, batch_size=2)
+    if resume:
+        checkpoint.load()
+    checkpoint.open(resume)
+    for r in records:
+        checkpoint.append(r)
+    checkpoint.close()
+    return checkpoint
+
+
+def test_load_keeps_only_index_and_reads_records_back(tmp_path):
+    write_checkpoint(str(tmp_path), [record(i) for i in range(3)])
+
+    checkpoint = main.ScanCheckpoint(str(tmp_path), {'subfolders': True})
+    index = checkpoint.load()
+    assert sorted(index) == [f"/fotos/p{i}.jpg" for i in range(3)]
+    size, mtime, offset = index["/fotos/p1.jpg"]
+    assert (size, mtime) == (1001, 1700000001.5)
+    assert checkpoint.read(offset) == record(1)
+    checkpoint.close()
+
+
+def test_torn_tail_is_truncated_before_appending(tmp_path):
+    checkpoint = write_checkpoint(str(tmp_path), [record(i) for i in range(3)])
+    with open(checkpoint.path, "ab") as f:
+        f.write(b'{"path": "/fotos/p3.jpg", "si')  # Queda no meio da escrita
+
+    write_checkpoint(str(tmp_path), [record(i) for i in range(3, 7)], resume=True)
+
+    checkpoint = main.ScanCheckpoint(str(tmp_path), {'subfolders': True})
+    index = checkpoint.load()
+    assert sorted(index) == [f"/fotos/p{i}.jpg" for i in range(7)]
+    assert [checkpoint.read(index[f"/fotos/p{i}.jpg"][2]) for i in range(7)] == [record(i) for i in range(7)]
+    checkpoint.close()
+
+
+def test_checkpoint_of_other_options_is_ignored(tmp_path):
+    write_checkpoint(str(tmp_path), [record(0)])
+    checkpoint = main.ScanCheckpoint(str(tmp_path), {'subfolders': False})
+    assert checkpoint.load() == {}
+
+
+def test_remove_deletes_file(tmp_path):
+    checkpoint = write_checkpoint(str(tmp_path), [record(0)])
+    checkpoint.remove()
+    assert main.ScanCheckpoint(str(tmp_path), {'subfolders': True}).load() == {}
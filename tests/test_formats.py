@@ -0,0 +1,34 @@
+import struct
+
+import pytest
+
+import main
+
+
+def write_ftyp(path, major, compatible):
+    box = b"ftyp" + major + b"\x00\x00\x00\x00" + b"".join(compatible)
+    with open(path, "wb") as f:
+        f.write(struct.pack(">I", len(box) + 4) + box + b"\x00\x00\x00\x08free")
+    return str(path)
+
+
+@pytest.mark.parametrize("major,compatible,expected", [
+    (b"heic", [b"mif1", b"heic"], "HEIC"),
+    (b"mif1", [b"mif1", b"heic"], "HEIC"),
+    (b"msf1", [b"msf1", b"hevc"], "HEIC"),
+    (b"mif1", [b"mif1"], "HEIC"),
+    (b"avif", [b"avif", b"mif1", b"miaf"], "AVIF"),
+    (b"mif1", [b"mif1", b"miaf", b"avif"], "AVIF"),
+    (b"msf1", [b"msf1", b"miaf", b"avis"], "AVIF"),
+    (b"isom", [b"isom", b"mp41"], None),
+])
+def test_ftyp_brands(tmp_path, major, compatible, expected):
+    assert main.sniff_format(write_ftyp(tmp_path / "img", major, compatible)) == expected
+
+
+def test_long_brand_list_and_magic_bytes(tmp_path):
+    compatible = [b"mif1", b"miaf", b"MA1B", b"MA1A", b"iso8", b"mif2", b"MiHE", b"avif"]
+    assert main.sniff_format(write_ftyp(tmp_path / "img", b"mif1", compatible)) == "AVIF"
+    with open(tmp_path / "img.png", "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n" + b"\x00" * 8)
+    assert main.sniff_format(str(tmp_path / "img.png")) == "PNG"
@@ -0,0 +1,94 @@
+import os
+import random
+
+import pytest
+
+import main
+
+
+def brute_force_groups(hashes, threshold):
+    uf = main.UnionFind(len(hashes))
+    for i in range(len(hashes)):
+        for j in range(i + 1, len(hashes)):
+            if (hashes[i] ^ hashes[j]).bit_count() <= threshold:
+                uf.union(i, j)
+    groups = {}
+    for i in range(len(hashes)):
+        groups.setdefault(uf.find(i), []).append(i)
+    return sorted(sorted(group) for group in groups.values() if len(group) > 1)
+
+
+def near_duplicate_hashes(n, seed):
+    rng = random.Random(seed)
+    hashes = []
+    for i in range(n):
+        if hashes and rng.random() < 0.3:
+            h = rng.choice(hashes[-50:])
+            for _ in range(rng.randrange(12)):
+                h ^= 1 << rng.randrange(64)
+        elif rng.random() < 0.02:
+            h = 0  # Aglomerado de hashes idênticos (ex.: imagens de uma cor só)
+        else:
+            h = rng.getrandbits(64)
+        hashes.append(h)
+    return hashes
+
+
+@pytest.mark.parametrize("num_bands", [None, 4, 11])
+def test_streaming_grouper_matches_brute_force(num_bands):
+    hashes = near_duplicate_hashes(1200, seed=3)
+    grouper = main.StreamingGrouper(threshold=10, memory_budget_mb=0.05, num_bands=num_bands)
+    for i, h in enumerate(hashes):
+        grouper.add(f"/fotos/{i}.png", h, f"{i:032x}", extra={'i': i})
+    try:
+        groups = sorted(sorted(extra['i'] for _, _, _, extra in group) for group in grouper.iter_groups())
+    finally:
+        grouper.close()
+    assert groups == brute_force_groups(hashes, 10)
+
+
+@pytest.mark.parametrize("threshold", [0, 1])
+def test_streaming_grouper_small_thresholds(threshold):
+    hashes = near_duplicate_hashes(1200, seed=5)
+    hashes += [h ^ 1 for h in hashes[:100]]  # Pares a exatamente 1 bit
+    grouper = main.StreamingGrouper(threshold=threshold)
+    for i, h in enumerate(hashes):
+        grouper.add(f"/fotos/{i}.png", h, f"{i:032x}", extra={'i': i})
+    try:
+        groups = sorted(sorted(extra['i'] for _, _, _, extra in group) for group in grouper.iter_groups())
+    finally:
+        grouper.close()
+    assert groups == brute_force_groups(hashes, threshold)
+
+
+def test_choose_num_bands_respects_max_band_bits():
+    for threshold in range(0, 12):
+        for count in (10, 10 ** 4, 10 ** 7):
+            num_bands = main.choose_num_bands(64, threshold, count, max_band_bits=22)
+            assert max(mask.bit_length() for _, mask in main.hash_bands(64, num_bands)) <= 22
+
+
+def test_external_sorter_merges_in_levels(tmp_path):
+    sorter = main.ExternalSorter(2, 10, str(tmp_path), max_open_runs=4)
+    records = [(random.getrandbits(64), i) for i in range(1000)]
+    for record in records:
+        sorter.add(record)
+    assert len(sorter.run_paths) == 100
+    assert list(sorter.merged()) == sorted(records)
+    assert os.listdir(tmp_path) == []
+
+
+def test_group_store_round_trip():
+    store = main.GroupStore()
+    store.append([("/a.png", 1, "m1", {'sharpness': 2.0}), ("/b.png", 3, "m1", None)])
+    store.append([("/c\udcff.png", 5, "m2", None), ("/d.png", 7, "m3", None)])
+    try:
+        assert len(store) == 2
+        assert store[0] == [("/a.png", 1, "m1"), ("/b.png", 3, "m1")]
+        assert store[-1][0][0] == "/c\udcff.png"
+        assert store.qualities(0) == [{'sharpness': 2.0}, None]
+        assert [len(group) for group in store] == [2, 2]
+        with pytest.raises(IndexError):
+            store[2]
+    finally:
+        store.close()
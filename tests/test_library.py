@@ -0,0 +1,71 @@
+import glob
+import os
+import random
+
+import pytest
+
+import main
+
+
+def build_library(library_dir, count, seed, num_bands=None, threshold=10):
+    rng = random.Random(seed)
+    entries = []
+    builder = main.ReferenceLibraryBuilder(str(library_dir), num_bands=num_bands, threshold=threshold)
+    for i in range(count):
+        variants = [rng.getrandbits(64) for _ in range(8)] if i % 3 == 0 else None
+        hash_int = variants[0] if variants else rng.getrandbits(64)
+        builder.add(f"/ref/{i}.png", hash_int, f"{i:032x}", variants=variants)
+        entries.append(variants or [hash_int])
+    builder.finish()
+    return entries
+
+
+def brute_force_query(entries, hashes, threshold, max_results):
+    best = []
+    for i, indexed in enumerate(entries):
+        distance = min((h ^ q).bit_count() for h in indexed for q in hashes)
+        if distance <= threshold:
+            best.append((distance, i))
+    best.sort()
+    return [(f"/ref/{i}.png", f"{i:032x}", distance) for distance, i in best[:max_results]]
+
+
+@pytest.mark.parametrize("num_bands", [None, 3])
+def test_query_matches_brute_force(tmp_path, num_bands):
+    entries = build_library(tmp_path, 3000, seed=11, num_bands=num_bands)
+    rng = random.Random(12)
+    library = main.ReferenceLibrary(str(tmp_path))
+    try:
+        for _ in range(50):
+            base = rng.choice(entries)[0]
+            hashes = [base ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64)), rng.getrandbits(64)]
+            assert library.query(hashes, 10, max_results=50) == brute_force_query(entries, hashes, 10, 50)
+    finally:
+        library.close()
+
+
+@pytest.mark.parametrize("threshold", [0, 1])
+def test_small_thresholds(tmp_path, threshold):
+    entries = build_library(tmp_path, 2000, seed=14, threshold=threshold)
+    rng = random.Random(15)
+    library = main.ReferenceLibrary(str(tmp_path))
+    try:
+        for _ in range(50):
+            base = rng.choice(entries)[0]
+            hashes = [base, base ^ (1 << rng.randrange(64)), rng.getrandbits(64)]
+            for query_threshold in (0, 1):
+                assert (library.query(hashes, query_threshold, max_results=50)
+                        == brute_force_query(entries, hashes, query_threshold, 50))
+    finally:
+        library.close()
+
+
+def test_library_without_bucket_tables_still_loads(tmp_path):
+    entries = build_library(tmp_path, 500, seed=13)
+    for path in glob.glob(os.path.join(tmp_path, "band*_starts.npy")):
+        os.remove(path)
+    library = main.ReferenceLibrary(str(tmp_path))
+    try:
+        assert library.query([entries[7][0]], 10)[0] == ("/ref/7.png", f"{7:032x}", 0)
+    finally:
+        library.close()
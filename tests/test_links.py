@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+import main
+
+
+def write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def no_reflink(monkeypatch):
+    # Força o caminho do hardlink, independente do sistema de arquivos do teste
+    monkeypatch.setattr(main, "try_reflink", lambda src, dst: False)
+
+
+def test_rejects_files_that_differ(tmp_path):
+    keep = write(tmp_path / "a.jpg", b"x" * 1000)
+    dup = write(tmp_path / "b.jpg", b"x" * 999 + b"y")
+
+    with pytest.raises(ValueError):
+        main.replace_with_link(keep, dup)
+    with open(dup, "rb") as f:
+        assert f.read() == b"x" * 999 + b"y"
+    assert os.stat(dup).st_ino != os.stat(keep).st_ino
+
+
+def test_hardlink_shares_inode_and_reclaims_size(tmp_path):
+    keep = write(tmp_path / "a.jpg", b"x" * 1000)
+    dup = write(tmp_path / "b.jpg", b"x" * 1000)
+
+    assert main.replace_with_link(keep, dup) == ("hardlink", 1000)
+    assert os.stat(dup).st_ino == os.stat(keep).st_ino
+    assert os.stat(keep).st_nlink == 2
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".link_tmp")]
+
+    # Chamar de novo não recupera nada
+    assert main.replace_with_link(keep, dup) == ("hardlink", 0)
+
+
+def test_duplicate_with_other_hardlinks_reclaims_nothing(tmp_path):
+    keep = write(tmp_path / "a.jpg", b"x" * 1000)
+    dup = write(tmp_path / "b.jpg", b"x" * 1000)
+    os.link(dup, tmp_path / "outro_nome.jpg")
+
+    assert main.replace_with_link(keep, dup) == ("hardlink", 0)
+    assert os.stat(dup).st_ino == os.stat(keep).st_ino
+    assert os.path.exists(tmp_path / "outro_nome.jpg")
+
+
+def test_symlink_duplicate_is_left_alone(tmp_path):
+    keep = write(tmp_path / "a.jpg", b"x" * 1000)
+    target = write(tmp_path / "alvo.jpg", b"x" * 1000)
+    dup = str(tmp_path / "b.jpg")
+    os.symlink(target, dup)
+
+    with pytest.raises(ValueError):
+        main.replace_with_link(keep, dup)
+    assert os.path.islink(dup)
+    assert os.readlink(dup) == target
+
+    # Um link simbólico para o próprio arquivo mantido também não é trocado
+    os.remove(dup)
+    os.symlink(keep, dup)
+    with pytest.raises(ValueError):
+        main.replace_with_link(keep, dup)
+    assert os.path.islink(dup)
@@ -0,0 +1,67 @@
+import random
+
+from PIL import Image, ImageFilter
+
+import main
+
+
+def make_image(size, seed=0):
+    """Ruído com bordas bem definidas (cada célula 4x4 de uma cor)."""
+    rng = random.Random(seed)
+    small = Image.new("L", (size[0] // 4, size[1] // 4))
+    small.putdata([rng.randrange(256) for _ in range(small.width * small.height)])
+    return small.resize(size, Image.NEAREST)
+
+
+def info(img, mtime, file_size=10000):
+    return {'mtime': mtime, 'quality': main.quality_features(img, img.convert("L"), file_size)}
+
+
+def best(policy, infos):
+    return sorted(infos, key=main.KEEPER_POLICIES[policy])[0]
+
+
+def test_sharper_copy_wins():
+    sharp = make_image((400, 300))
+    blurred = sharp.filter(ImageFilter.GaussianBlur(3))
+    sharp_info, blurred_info = info(sharp, 2000.0), info(blurred, 1000.0)
+
+    assert sharp_info['quality']['sharpness'] > blurred_info['quality']['sharpness']
+    assert best("Mais nítida", [blurred_info, sharp_info]) is sharp_info
+    assert best("Mais antiga", [blurred_info, sharp_info]) is blurred_info
+
+
+def test_higher_resolution_wins_and_stays_sharper():
+    large = make_image((800, 600))
+    small = large.resize((200, 150), Image.BILINEAR)
+    large_info, small_info = info(large, 2000.0), info(small, 1000.0)
+
+    assert (large_info['quality']['width'], large_info['quality']['height']) == (800, 600)
+    assert (small_info['quality']['width'], small_info['quality']['height']) == (200, 150)
+    assert best("Maior resolução", [small_info, large_info]) is large_info
+    assert best("Melhor qualidade", [small_info, large_info]) is large_info
+    # A cópia reduzida, ampliada para o mesmo proxy, perde nitidez
+    assert large_info['quality']['sharpness'] > small_info['quality']['sharpness']
+
+
+def test_ties_go_to_the_oldest():
+    img = make_image((300, 200))
+    newer, older, newest = info(img, 2000.0), info(img, 1000.0), info(img, 3000.0)
+    for policy in main.KEEPER_POLICIES:
+        assert best(policy, [newer, newest, older]) is older
+
+
+def test_missing_quality_ranks_last():
+    measured = info(make_image((300, 200)), 2000.0)
+    unmeasured = {'mtime': 1000.0, 'quality': None}
+    assert best("Maior resolução", [unmeasured, measured]) is measured
+    assert best("Mais nítida", [unmeasured, measured]) is measured
+
+
+def test_rotation_hash_matches_plain_hash(tmp_path):
+    path = str(tmp_path / "img.png")
+    make_image((160, 120), seed=3).save(path)
+    plain = main.compute_image_hashes(path)
+    rotations = main.compute_image_hashes(path, detect_rotations=True)
+    assert rotations['hash'] == plain['hash'] == rotations['variants'][0]
+    assert rotations['quality'] == plain['quality']
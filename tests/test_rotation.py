@@ -0,0 +1,85 @@
+import random
+
+import imagehash
+import pytest
+from PIL import Image
+
+import main
+
+
+def make_image(seed, size=(96, 64)):
+    """Imagem suave e assimétrica (ruído 8x8 ampliado)."""
+    rng = random.Random(seed)
+    small = Image.new("L", (8, 8))
+    small.putdata([rng.randrange(256) for _ in range(64)])
+    return small.resize(size, Image.BILINEAR)
+
+
+TRANSPOSES = ["FLIP_LEFT_RIGHT", "FLIP_TOP_BOTTOM", "ROTATE_90", "ROTATE_180", "ROTATE_270",
+              "TRANSPOSE", "TRANSVERSE"]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_first_variant_is_the_plain_phash(seed):
+    img = make_image(seed)
+    variants = main.dihedral_phashes(main.phash_dct_lowfreq(img))
+    assert variants[0] == main.phash_to_int(imagehash.phash(img))
+    assert len(variants) == 8
+
+
+def transposed_matches(transpose, size):
+    index = main.HammingIndex(threshold=10)
+    for seed in range(20):
+        index.add(seed, main.dihedral_phashes(main.phash_dct_lowfreq(make_image(seed, size))))
+    for seed in range(20):
+        transposed = make_image(seed, size).transpose(getattr(Image.Transpose, transpose))
+        yield seed, index.query(main.phash_to_int(imagehash.phash(transposed)))
+
+
+@pytest.mark.parametrize("transpose", TRANSPOSES)
+def test_every_transpose_is_found_at_distance_zero(transpose):
+    # No tamanho do proxy (32x32) não há reamostragem, então a transposição é exata
+    for seed, matches in transposed_matches(transpose, (32, 32)):
+        assert matches[0] == (seed, 0)
+
+
+@pytest.mark.parametrize("transpose", TRANSPOSES)
+def test_transposes_of_resampled_images_stay_close(transpose):
+    # O arredondamento do redimensionamento pode trocar alguns bits perto da mediana
+    for seed, matches in transposed_matches(transpose, (96, 64)):
+        assert matches[0][0] == seed
+        assert matches[0][1] <= 4
+
+
+def brute_force_query(entries, hashes, threshold):
+    best = {}
+    for key, indexed in entries.items():
+        distance = min((h ^ q).bit_count() for h in indexed for q in hashes)
+        if distance <= threshold:
+            best[key] = distance
+    return sorted(best.items(), key=lambda x: (x[1], x[0]))
+
+
+@pytest.mark.parametrize("threshold,num_bands", [(10, None), (10, 4), (3, None), (0, None)])
+def test_hamming_index_matches_brute_force(threshold, num_bands):
+    rng = random.Random(threshold)
+    index = main.HammingIndex(threshold, num_bands=num_bands)
+    entries = {}
+    for key in range(3000):
+        if entries and rng.random() < 0.3:
+            base = rng.choice(list(entries.values()))
+            hashes = [h ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64)) for h in base]
+        else:
+            hashes = [rng.getrandbits(64) for _ in range(rng.choice([1, 8]))]
+        # Consultas intercaladas com inserções, como no serviço
+        if key % 7 == 0:
+            query = [hashes[0] ^ (1 << rng.randrange(64))]
+            matches = index.query(query)
+            assert sorted(matches, key=lambda x: (x[1], x[0])) == brute_force_query(entries, query, threshold)
+            assert [distance for _, distance in matches] == sorted(distance for _, distance in matches)
+        index.add(f"k{key}", hashes)
+        entries[f"k{key}"] = hashes
+    assert len(index) == 3000
+    for _ in range(50):
+        query = rng.choice(list(entries.values()))[:2]
+        assert sorted(index.query(query), key=lambda x: (x[1], x[0])) == brute_force_query(entries, query, threshold)
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import random
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+import main
+
+
+def make_image(path, seed):
+    """Imagem suave (ruído 8x8 ampliado), estável sob recompressão."""
+    rng = random.Random(seed)
+    small = Image.new("L", (8, 8))
+    small.putdata([rng.randrange(256) for _ in range(64)])
+    small.resize((128, 128), Image.BILINEAR).convert("RGB").save(path)
+
+
+@pytest.fixture
+def service(tmp_path):
+    """Serviço com um único worker, rodando em uma thread, acessado por socket Unix."""
+    socket_path = str(tmp_path / "dedup.sock")
+    svc = main.DedupService(threshold=10, workers=1, decode_timeout=1)
+    thread = threading.Thread(target=asyncio.run, args=(svc.serve(socket_path=socket_path),), daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not os.path.exists(socket_path):
+        assert time.monotonic() < deadline, "serviço não iniciou"
+        time.sleep(0.05)
+    client = main.DedupClient(socket_path=socket_path, timeout=30)
+    yield svc, client, thread
+    if thread.is_alive():
+        try:
+            client.request("shutdown")
+        except OSError:
+            pass
+        thread.join(10)
+    client.close()
+
+
+def test_add_lookup_stats_shutdown(service, tmp_path):
+    svc, client, thread = service
+    make_image(tmp_path / "a.png", 7)
+    Image.open(tmp_path / "a.png").convert("RGB").save(tmp_path / "a_copy.jpg", quality=95)
+    make_image(tmp_path / "other.png", 101)
+
+    added = client.request("add", paths=[str(tmp_path / "a.png"), str(tmp_path / "other.png")])
+    assert added["ok"]
+    assert all("error" not in r for r in added["results"])
+
+    looked_up = client.request("lookup", paths=[str(tmp_path / "a_copy.jpg")])
+    matches = looked_up["results"][0]["matches"]
+    assert [m["path"] for m in matches] == [str(tmp_path / "a.png")]
+    assert not looked_up["results"][0]["duplicate"]
+
+    by_hash = client.request("lookup", hashes=[added["results"][0]["hash"]])
+    assert by_hash["results"][0]["matches"][0]["distance"] == 0
+
+    stats = client.request("stats")["stats"]
+    assert stats["indexed_images"] == 2
+    assert stats["files_decoded"] == 3
+    assert stats["requests"]["add"] == 1
+
+    assert client.request("shutdown") == {"ok": True}
+    thread.join(10)
+    assert not thread.is_alive()
+
+
+def test_hung_decoder_is_killed_and_does_not_block(service, tmp_path):
+    svc, client, thread = service
+    hang = tmp_path / "hang.png"
+    os.mkfifo(hang)  # open() bloqueia para sempre: ninguém escreve no FIFO
+    make_image(tmp_path / "b.png", 13)
+
+    result = client.request("hash", paths=[str(hang)])["results"][0]
+    assert result["error"]["type"] == "Tempo Esgotado"
+
+    # O único worker foi recriado: a próxima imagem é decodificada normalmente
+    result = client.request("lookup", paths=[str(tmp_path / "b.png")])["results"][0]
+    assert "error" not in result
+    assert result["format"] == "PNG"
+
+    # Um arquivo travado em andamento também não impede o shutdown
+    svc.decode_timeout = 60
+    hung_client = main.DedupClient(socket_path=client.sock.getpeername(), timeout=30)
+    hung_client.stream.write(b'{"op": "hash", "paths": ["%s"]}\n' % str(hang).encode())
+    hung_client.stream.flush()
+    time.sleep(0.5)
+    start = time.monotonic()
+    assert client.request("shutdown") == {"ok": True}
+    thread.join(10)
+    assert not thread.is_alive()
+    assert time.monotonic() - start < 10
+    hung_client.close()